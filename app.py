@@ -3,9 +3,9 @@ import time
 import json
 from database import Database
 from datetime import datetime
-from enhanced_scraper import scrape_post
-from scraper import scrape_category # استيراد الدالة الجديدة
-import pandas as pd
+from discovery import discover_posts
+from jobs import submit_scrape_job
+from scraper import extraction_stats
 
 # تهيئة قاعدة البيانات في session_state
 if "db" not in st.session_state:
@@ -36,16 +36,12 @@ def show_scraping_page():
 
         db = st.session_state.db
 
-        for i, url in enumerate(urls, 1):
-            with st.spinner(f"⏳ استخراج المنشور {i}/{len(urls)}..."):
-                try:
-                    scrape_post(url)  # حفظ مباشر في قاعدة البيانات
-                    st.success(f"✅ تم حفظ المنشور: {url}")
-                except Exception as e:
-                    st.error(f"❌ فشل استخراج المنشور: {url}\n{e}")
+        # الاستخراج يعمل في الخلفية؛ الصفحة لا تنتظره ويمكن مغادرتها دون فقدان العمل
+        job_id = submit_scrape_job(urls, db_path=db.db_path)
+        st.session_state.setdefault("my_job_ids", []).append(job_id)
+        st.success(f"✅ تمت إضافة المهمة #{job_id} ({len(urls)} رابط) إلى قائمة الانتظار")
 
-        st.balloons()
-        st.success("🎉 اكتمل الاستخراج لجميع المنشورات!")
+    show_scrape_jobs()
 
     st.markdown("---")
     st.markdown("### 🕸️ زاحف التصنيفات (Category Crawler)")
@@ -61,8 +57,9 @@ def show_scraping_page():
         
         with st.spinner(f"⏳ جاري استخراج الروابط من {num_pages} صفحات..."):
             try:
-                # استخدام الدالة الجديدة
-                new_links = scrape_category(category_url, pages=num_pages)
+                # الاكتشاف عبر الخلاصات/خرائط الموقع أولاً، والزحف عبر المتصفح كحل أخير فقط
+                discovered = list(discover_posts(category_url, pages=num_pages))
+                new_links = [post["url"] for post in discovered]
                 
                 if new_links:
                     st.success(f"✅ تم استخراج {len(new_links)} رابط جديد.")
@@ -77,6 +74,35 @@ def show_scraping_page():
                 st.error(f"❌ فشل زحف التصنيفات: {e}")
 
 
+# -------------------------------------------
+# جدول مهام الاستخراج في الخلفية (يتحدث تلقائياً دون إعادة تشغيل الصفحة كاملة)
+@st.fragment(run_every="3s")
+def show_scrape_jobs():
+    st.markdown("#### 📋 مهام الاستخراج")
+    db = st.session_state.db
+
+    for job_id in reversed(st.session_state.get("my_job_ids", [])):
+        job = db.get_scrape_job(job_id)
+        if not job or job["status"] not in ("queued", "running"):
+            continue
+        processed = job["completed_urls"] + job["failed_urls"]
+        eta = f"{job['eta_seconds']:.0f} ث" if job["eta_seconds"] is not None else "—"
+        st.progress(
+            processed / job["total_urls"] if job["total_urls"] else 0.0,
+            text=f"المهمة #{job_id}: {processed}/{job['total_urls']} • الوقت المتبقي: {eta}"
+        )
+
+    jobs_df = db.get_scrape_jobs(limit=20)
+    if jobs_df.empty:
+        st.caption("لا توجد مهام بعد.")
+    else:
+        st.dataframe(jobs_df, use_container_width=True, hide_index=True)
+
+    with st.expander("🎯 إحصائيات محددات الاستخراج (أي المحددات البديلة تعمل فعلاً)"):
+        stats = extraction_stats()
+        st.dataframe(stats["rules"], use_container_width=True, hide_index=True)
+        st.dataframe(stats["selectors"], use_container_width=True, hide_index=True)
+
 # -------------------------------------------
 # صفحة بيانات التدريب المحسنة (ملخص)
 def show_enhanced_data_page():
@@ -84,7 +110,7 @@ def show_enhanced_data_page():
     st.info("💡 هذه الصفحة تعرض ملخصاً للبيانات المحسنة التي تم استخراجها للتدريب")
 
     db = st.session_state.db
-    df = db.get_enhanced_training_data() if db.get_enhanced_training_data() is not None else pd.DataFrame()
+    df = db.get_enhanced_training_data()
 
     if not df.empty:
         st.success(f"📊 إجمالي بيانات التدريب: {len(df)}")
@@ -162,7 +188,7 @@ def show_detailed_data():
     st.info("هذه الصفحة تعرض جميع الحقول المستخرجة بما في ذلك البيانات الخام والتقييمات.")
 
     db = st.session_state.db
-    df = db.get_enhanced_training_data() if db.get_enhanced_training_data() is not None else pd.DataFrame()
+    df = db.get_enhanced_training_data()
 
     if not df.empty:
         st.success(f"📊 إجمالي السجلات التفصيلية: {len(df)}")
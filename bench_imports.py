@@ -0,0 +1,66 @@
+"""
+قياس زمن استيراد الوحدات التي تعتمد عليها نقاط الدخول (cli / scheduler / jobs ...) لرصد أي
+تراجع في سرعة الإقلاع. app.py نفسه غير مُدرج لأنه يستورد Streamlit وينفّذ الواجهة عند الاستيراد،
+لكن كل الوحدات التي يستوردها مُقاسة هنا.
+
+يُشغَّل كل استيراد في عملية Python جديدة ويُقاس زمنه، ثم يُتحقق من أن المكتبات
+الثقيلة (pandas, playwright, bs4, soupsieve, apscheduler, requests) لم تُحمَّل أثناء الاستيراد.
+
+    python bench_imports.py                # جدول بالنتائج
+    python bench_imports.py --budget-ms 150 --repeat 5
+
+يعيد رمز خروج 1 إذا حُمّلت مكتبة ثقيلة أو تجاوز الزمن الميزانية المحددة.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+MODULES = ["database", "extraction", "scraper", "enhanced_scraper", "discovery", "jobs", "scheduler", "cli"]
+HEAVY_MODULES = ["pandas", "playwright", "bs4", "soupsieve", "apscheduler", "requests"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(module: str, repeat: int = 3):
+    """يعيد أفضل زمن استيراد (بالمللي ثانية) وقائمة المكتبات الثقيلة المحمّلة."""
+    best, heavy = None, []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        best = result["ms"] if best is None else min(best, result["ms"])
+        heavy = result["heavy"]
+    return best, heavy
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="قياس زمن استيراد نقاط الدخول")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=200.0,
+                        help="الحد الأقصى المسموح لزمن استيراد كل وحدة")
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'module':<20}{'ms':>10}  heavy")
+    for module in args.modules:
+        ms, heavy = measure(module, args.repeat)
+        over_budget = ms > args.budget_ms
+        failed = failed or over_budget or bool(heavy)
+        flag = " ⚠️" if over_budget or heavy else ""
+        print(f"{module:<20}{ms:>10.1f}  {', '.join(heavy) or '-'}{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
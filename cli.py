@@ -0,0 +1,170 @@
+"""
+واجهة سطر أوامر خفيفة (بدون Streamlit) لاستخراج الروابط والتصدير وعرض الإحصائيات.
+
+أمثلة:
+    python cli.py scrape https://io.hsoub.com/programming/1234
+    python cli.py scrape --file urls.txt
+    python cli.py discover https://io.hsoub.com/programming --pages 3 > urls.txt
+    python cli.py export --output training_data.jsonl
+    python cli.py stats
+    python cli.py maintenance --retention-months 6
+    python cli.py build-dataset --output-dir dataset --max-tokens 2048
+
+يتم تحميل Playwright و BeautifulSoup فقط عند تنفيذ أمر scrape فعلياً.
+"""
+import argparse
+import json
+import sys
+import time
+
+from database import Database
+
+
+def _read_urls(args):
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            urls.extend(line.strip() for line in f if line.strip())
+    return urls
+
+
+def cmd_scrape(args, db: Database) -> int:
+    from enhanced_scraper import scrape_post
+
+    urls = _read_urls(args)
+    if not urls:
+        print("❌ يرجى إدخال رابط واحد على الأقل", file=sys.stderr)
+        return 1
+
+    failures = 0
+    for i, url in enumerate(urls, 1):
+        start = time.time()
+        try:
+            scrape_post(url, db=db)
+            db.add_scrape_history(url, "success", items_count=1, duration=time.time() - start)
+            print(f"✅ [{i}/{len(urls)}] {url}")
+        except Exception as e:
+            failures += 1
+            db.add_scrape_history(url, "failed", duration=time.time() - start, error_message=str(e))
+            print(f"❌ [{i}/{len(urls)}] {url}: {e}", file=sys.stderr)
+
+    if args.rule_stats:
+        from scraper import extraction_stats
+
+        stats = extraction_stats()
+        for row in stats["rules"]:
+            print(f"{row['rule']:<28}hits={row['hits']:<6}misses={row['misses']}", file=sys.stderr)
+        for row in stats["selectors"]:
+            print(f"  {row['rule']:<26}{row['selector']:<28}hits={row['hits']}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def cmd_discover(args, db: Database) -> int:
+    from discovery import discover_posts
+
+    count = 0
+    for post in discover_posts(args.category_url, pages=args.pages, since=args.since,
+                               fallback=not args.no_render, feeds=args.feed, sitemaps=args.sitemap,
+                               limit=args.limit):
+        count += 1
+        print(post["url"])
+    print(f"✅ تم اكتشاف {count} رابط", file=sys.stderr)
+    return 0
+
+
+def cmd_export(args, db: Database) -> int:
+    db.export_to_jsonl(args.output)
+    print(f"✅ تم التصدير إلى {args.output}")
+    return 0
+
+
+def cmd_stats(args, db: Database) -> int:
+    print(json.dumps(db.get_statistics(), ensure_ascii=False, indent=2, default=str))
+    return 0
+
+
+def cmd_maintenance(args, db: Database) -> int:
+    result = db.run_maintenance(args.retention_months, convert_vacuum=args.convert_vacuum)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not result["incremental"]:
+        print("⚠️ القاعدة ليست بوضع auto_vacuum=INCREMENTAL؛ لتحويلها (VACUUM كامل يقفل القاعدة): "
+              "--convert-vacuum", file=sys.stderr)
+    return 0
+
+
+def cmd_build_dataset(args, db: Database) -> int:
+    from dataset_builder import build_dataset
+
+    manifest = build_dataset(
+        db,
+        output_dir=args.output_dir,
+        max_tokens=args.max_tokens,
+        min_tokens=args.min_tokens,
+        shard_size=args.shard_size,
+        workers=args.workers,
+        tokenizer=args.tokenizer,
+        training_ready_only=not args.all_rows,
+    )
+    for split, split_stats in manifest["splits"].items():
+        print(f"{split:<6} records={split_stats['records']} tokens={split_stats['tokens']} "
+              f"shards={len(split_stats['shards'])}")
+    print(f"✅ تم بناء مجموعة البيانات في {args.output_dir} (أعداد رموز مخزنة: {manifest['cached_rows']})")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="أدوات سطر الأوامر لمستخرج حسوب IO")
+    parser.add_argument("--db", default="hsoub_scraper.db", help="مسار قاعدة البيانات")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_scrape = sub.add_parser("scrape", help="استخراج قائمة منشورات وحفظها")
+    p_scrape.add_argument("urls", nargs="*", help="روابط المنشورات")
+    p_scrape.add_argument("--file", help="ملف نصي يحتوي رابطاً في كل سطر")
+    p_scrape.add_argument("--rule-stats", action="store_true", help="عرض عدادات محددات الاستخراج في النهاية")
+    p_scrape.set_defaults(func=cmd_scrape)
+
+    p_discover = sub.add_parser("discover", help="اكتشاف روابط منشورات تصنيف (خلاصات/خرائط موقع)")
+    p_discover.add_argument("category_url")
+    p_discover.add_argument("--pages", type=int, default=1)
+    p_discover.add_argument("--since", help="تجاهل المنشورات التي لم تُعدَّل منذ هذا التاريخ (ISO)")
+    p_discover.add_argument("--no-render", action="store_true", help="عدم استخدام Playwright كحل أخير")
+    p_discover.add_argument("--feed", action="append", help="خلاصة RSS/Atom (رابط أو ملف محلي)؛ يمكن تكراره")
+    p_discover.add_argument("--sitemap", action="append", help="خريطة موقع (رابط أو ملف محلي)؛ يمكن تكراره")
+    p_discover.add_argument("--limit", type=int, help="الحد الأقصى للروابط (الافتراضي: الصفحات × 20)")
+    p_discover.set_defaults(func=cmd_discover)
+
+    p_export = sub.add_parser("export", help="تصدير بيانات التدريب بصيغة JSONL")
+    p_export.add_argument("--output", default="training_data.jsonl")
+    p_export.set_defaults(func=cmd_export)
+
+    p_stats = sub.add_parser("stats", help="عرض إحصائيات قاعدة البيانات")
+    p_stats.set_defaults(func=cmd_stats)
+
+    p_maint = sub.add_parser("maintenance", help="أرشفة سجل الاستخراج القديم في ملفات شهرية وضغط القاعدة")
+    p_maint.add_argument("--retention-months", type=int, default=6,
+                         help="عدد الأشهر التي تبقى في القاعدة الرئيسية")
+    p_maint.add_argument("--convert-vacuum", action="store_true",
+                         help="تحويل قاعدة قديمة إلى auto_vacuum=INCREMENTAL بـ VACUUM كامل (لمرة واحدة، يقفل القاعدة)")
+    p_maint.set_defaults(func=cmd_maintenance)
+
+    p_dataset = sub.add_parser("build-dataset", help="بناء مجموعة بيانات تدريب مقسّمة (train/val/test)")
+    p_dataset.add_argument("--output-dir", default="dataset")
+    p_dataset.add_argument("--max-tokens", type=int, default=2048)
+    p_dataset.add_argument("--min-tokens", type=int, default=32)
+    p_dataset.add_argument("--shard-size", type=int, default=1000)
+    p_dataset.add_argument("--workers", type=int, help="عدد العمليات (الافتراضي: عدد المعالجات)")
+    p_dataset.add_argument("--tokenizer", default="regex", help="regex أو tiktoken:cl100k_base")
+    p_dataset.add_argument("--all-rows", action="store_true", help="تضمين الصفوف غير الجاهزة للتدريب")
+    p_dataset.set_defaults(func=cmd_build_dataset)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    db = Database(args.db)
+    return args.func(args, db)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,55 @@
 import sqlite3
-import pandas as pd
 import json
 import hashlib
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import os
+import glob
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # pandas ثقيلة الاستيراد؛ يتم تحميلها عند أول استعلام يعيد DataFrame فقط
+    import pandas as pd
+
+# الجداول التي تنمو مع الوقت وتُنقل صفوفها القديمة إلى ملفات أرشيف شهرية.
+# scraped_data لا يُؤرشف: قيد UNIQUE(data_hash) فيه هو ما يمنع تكرار المحتوى عند الحفظ،
+# ونقل صفوفه خارج القاعدة يسمح بإدخال المحتوى نفسه مرة أخرى
+ARCHIVED_TABLES = ("scrape_history",)
+# SQLite يسمح افتراضياً بإرفاق 10 قواعد بيانات فقط في الاتصال الواحد
+MAX_ATTACHED_ARCHIVES = 8
+# مدة انتظار قفل الكتابة قبل الفشل (القيمة الافتراضية في sqlite3 هي 5 ثوانٍ)
+BUSY_TIMEOUT_SECONDS = 30
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _month_start(d: date, months_back: int = 0) -> date:
+    month_index = d.year * 12 + (d.month - 1) - months_back
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def _table_columns(conn, schema: str, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
 
 class Database:
-    def __init__(self, db_path: str = "hsoub_scraper.db"):
+    def __init__(self, db_path: str = "hsoub_scraper.db", archive_dir: Optional[str] = None):
         self.db_path = db_path
+        # ملفات الأرشيف الشهرية تُحفظ افتراضياً في مجلد archive بجوار قاعدة البيانات
+        self.archive_dir = archive_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), "archive")
         self._init_db()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        # عمال المهام والنبض وتحديث واجهة Streamlit يكتبون في الوقت نفسه: WAL يسمح بالقراءة
+        # أثناء الكتابة، والمهلة تجعل الكاتب ينتظر القفل بدلاً من الفشل فوراً بـ "database is locked"
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS,
+                               detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
+        # يسري فقط على قاعدة جديدة بلا جداول (ويجب أن يسبق WAL)؛ القواعد القائمة لا تتغير
+        # إلا بـ compact_database(convert=True)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        return conn
 
     def _init_db(self):
         conn = self._get_connection()
@@ -79,14 +117,59 @@ class Database:
             )
         """)
 
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scrape_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                urls_json TEXT NOT NULL,
+                total_urls INTEGER DEFAULT 0,
+                completed_urls INTEGER DEFAULT 0,
+                failed_urls INTEGER DEFAULT 0,
+                throughput REAL DEFAULT 0,
+                eta_seconds REAL,
+                error_message TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                started_at DATETIME,
+                finished_at DATETIME,
+                owner TEXT,
+                heartbeat_at DATETIME
+            )
+        """)
+        # قواعد بيانات أُنشئ فيها scrape_jobs قبل إضافة عمودي المالك ونبض الحياة
+        job_columns = {row[1] for row in cursor.execute("PRAGMA table_info(scrape_jobs)")}
+        for column in ("owner TEXT", "heartbeat_at DATETIME"):
+            if column.split()[0] not in job_columns:
+                cursor.execute(f"ALTER TABLE scrape_jobs ADD COLUMN {column}")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS token_counts (
+                row_id INTEGER NOT NULL,
+                tokenizer TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                comment_tokens_json TEXT NOT NULL,
+                PRIMARY KEY (row_id, tokenizer)
+            )
+        """)
+
         # Indexes for performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_scraped_at ON scraped_data(scraped_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_category ON scraped_data(category)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_history_scraped_at ON scrape_history(scraped_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_training_ready ON enhanced_training_data(training_ready)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_training_post_url ON enhanced_training_data(post_url, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_status ON scrape_jobs(status)")
 
         conn.commit()
         conn.close()
 
+    def _read_sql_query(self, query: str, params=()) -> "pd.DataFrame":
+        import pandas as pd
+        conn = self._get_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+
     def _hash_content(self, text: str) -> str:
         return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
 
@@ -157,49 +240,89 @@ class Database:
         conn.commit()
         conn.close()
 
-    def get_all_scraped_data(self, limit: int = 1000) -> pd.DataFrame:
-        conn = self._get_connection()
+    def get_all_scraped_data(self, limit: int = 1000) -> "pd.DataFrame":
         query = "SELECT * FROM scraped_data ORDER BY scraped_at DESC LIMIT ?"
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df
+        return self._read_sql_query(query, (limit,))
 
-    def get_enhanced_training_data(self, limit: int = 1000) -> pd.DataFrame:
-        conn = self._get_connection()
+    def get_enhanced_training_data(self, limit: int = 1000) -> "pd.DataFrame":
         query = "SELECT * FROM enhanced_training_data ORDER BY extracted_at DESC LIMIT ?"
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df
+        return self._read_sql_query(query, (limit,))
 
-    def search_scraped_data(self, search_term: str) -> pd.DataFrame:
-        conn = self._get_connection()
+    def search_scraped_data(self, search_term: str) -> "pd.DataFrame":
         pattern = f"%{search_term}%"
         query = """
             SELECT * FROM scraped_data
             WHERE title LIKE ? OR text_content LIKE ? OR category LIKE ?
             ORDER BY scraped_at DESC
         """
-        df = pd.read_sql_query(query, conn, params=(pattern, pattern, pattern))
-        conn.close()
-        return df
+        return self._read_sql_query(query, (pattern, pattern, pattern))
+
+    def _archive_path(self, month: str) -> str:
+        stem = os.path.splitext(os.path.basename(self.db_path))[0]
+        return os.path.join(self.archive_dir, f"{stem}_{month.replace('-', '_')}.db")
+
+    def _archive_months(self, start: date, end_exclusive: date) -> List[str]:
+        """أشهر الأرشيف (YYYY-MM) الموجودة على القرص والتي تتقاطع مع المدى المطلوب."""
+        months = []
+        for path in sorted(glob.glob(self._archive_path("*"))):
+            month = os.path.splitext(path)[0][-7:].replace("_", "-")
+            try:
+                month_start = date.fromisoformat(f"{month}-01")
+            except ValueError:
+                continue
+            if month_start < end_exclusive and _month_start(month_start, -1) > start:
+                months.append(month)
+        return months
+
+    def _query_date_range(self, table: str, start_date, end_date, include_archive: bool) -> "pd.DataFrame":
+        import pandas as pd
+
+        # مقارنة مدى مباشرة على العمود (بدلاً من DATE(scraped_at)) حتى يستخدم SQLite الفهرس
+        start = _to_date(start_date)
+        end_exclusive = _to_date(end_date) + timedelta(days=1)
+        params = (start.isoformat(), end_exclusive.isoformat())
+        where = "WHERE scraped_at >= ? AND scraped_at < ?"
 
-    def filter_by_date_range(self, start_date: str, end_date: str) -> pd.DataFrame:
         conn = self._get_connection()
-        query = """
-            SELECT * FROM scraped_data
-            WHERE DATE(scraped_at) BETWEEN ? AND ?
-            ORDER BY scraped_at DESC
-        """
-        df = pd.read_sql_query(query, conn, params=(start_date, end_date))
+        frames = [pd.read_sql_query(f"SELECT * FROM main.{table} {where}", conn, params=params)]
+        columns = list(frames[0].columns)
+
+        months = self._archive_months(start, end_exclusive) if include_archive else []
+        for i in range(0, len(months), MAX_ATTACHED_ARCHIVES):
+            batch = months[i:i + MAX_ATTACHED_ARCHIVES]
+            aliases = [f"arc_{j}" for j in range(len(batch))]
+            for alias, month in zip(aliases, batch):
+                conn.execute(f"ATTACH DATABASE ? AS {alias}", (self._archive_path(month),))
+            present = [
+                alias for alias in aliases
+                if conn.execute(f"SELECT 1 FROM {alias}.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+            ]
+            if present:
+                # ملفات الأرشيف نسخ مجمّدة من أعمدة الجدول وقت أرشفتها: الأعمدة المضافة لاحقاً
+                # إلى القاعدة الرئيسية تُقرأ منها كـ NULL
+                selects = []
+                for alias in present:
+                    archived = _table_columns(conn, alias, table)
+                    select_list = ", ".join(c if c in archived else f"NULL AS {c}" for c in columns)
+                    selects.append(f"SELECT {select_list} FROM {alias}.{table} {where}")
+                query = " UNION ALL ".join(selects)
+                frames.append(pd.read_sql_query(query, conn, params=params * len(present)))
+            for alias in aliases:
+                conn.execute(f"DETACH DATABASE {alias}")
         conn.close()
-        return df
 
-    def get_scrape_history(self, limit: int = 100) -> pd.DataFrame:
-        conn = self._get_connection()
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return df.sort_values("scraped_at", ascending=False, ignore_index=True)
+
+    def filter_by_date_range(self, start_date: str, end_date: str, include_archive: bool = False) -> "pd.DataFrame":
+        return self._query_date_range("scraped_data", start_date, end_date, include_archive)
+
+    def get_scrape_history_by_date(self, start_date: str, end_date: str, include_archive: bool = False) -> "pd.DataFrame":
+        return self._query_date_range("scrape_history", start_date, end_date, include_archive)
+
+    def get_scrape_history(self, limit: int = 100) -> "pd.DataFrame":
         query = "SELECT * FROM scrape_history ORDER BY scraped_at DESC LIMIT ?"
-        df = pd.read_sql_query(query, conn, params=(limit,))
-        conn.close()
-        return df
+        return self._read_sql_query(query, (limit,))
 
     def get_statistics(self) -> Dict[str, Any]:
         conn = self._get_connection()
@@ -230,6 +353,8 @@ class Database:
         cursor.execute("DELETE FROM scraped_data")
         cursor.execute("DELETE FROM scrape_history")
         cursor.execute("DELETE FROM enhanced_training_data")
+        cursor.execute("DELETE FROM token_counts")
+        cursor.execute("DELETE FROM scrape_jobs WHERE status NOT IN ('queued', 'running')")
         conn.commit()
         conn.close()
 
@@ -246,11 +371,8 @@ class Database:
         conn.close()
         return task_id
 
-    def get_scheduled_tasks(self):
-        conn = self._get_connection()
-        df = pd.read_sql_query("SELECT * FROM scheduled_tasks ORDER BY created_at DESC", conn)
-        conn.close()
-        return df
+    def get_scheduled_tasks(self) -> "pd.DataFrame":
+        return self._read_sql_query("SELECT * FROM scheduled_tasks ORDER BY created_at DESC")
 
     def update_task_status(self, task_id: int, is_active: bool):
         conn = self._get_connection()
@@ -266,14 +388,270 @@ class Database:
         conn.commit()
         conn.close()
 
+    # retention / maintenance
+    def archive_old_data(self, retention_months: int = 6) -> Dict[str, int]:
+        """
+        ينقل صفوف ARCHIVED_TABLES الأقدم من retention_months شهراً (أشهر كاملة) إلى
+        ملف SQLite مستقل لكل شهر داخل archive_dir، ويعيد عدد الصفوف المنقولة لكل جدول.
+        """
+        cutoff = _month_start(date.today(), retention_months).isoformat()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        moved = {table: 0 for table in ARCHIVED_TABLES}
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        for table in ARCHIVED_TABLES:
+            cursor.execute(f"SELECT DISTINCT substr(scraped_at, 1, 7) FROM {table} WHERE scraped_at < ?", (cutoff,))
+            months = [row[0] for row in cursor.fetchall() if row[0]]
+            for month in months:
+                month_start = f"{month}-01"
+                month_end = _month_start(date.fromisoformat(month_start), -1).isoformat()
+                cursor.execute("ATTACH DATABASE ? AS arc", (self._archive_path(month),))
+                try:
+                    cursor.execute(f"CREATE TABLE IF NOT EXISTS arc.{table} AS SELECT * FROM main.{table} WHERE 0")
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS arc.idx_{table}_scraped_at ON {table}(scraped_at)")
+                    # ملف شهر أُرشف سابقاً قد لا يحوي أعمدة أضيفت بعده؛ تُنسخ الأعمدة المشتركة فقط
+                    archived = _table_columns(conn, "arc", table)
+                    shared = ", ".join(c for c in _table_columns(conn, "main", table) if c in archived)
+                    # النسخ والحذف في معاملة واحدة: إما أن ينتقل الشهر كاملاً أو لا شيء
+                    cursor.execute(
+                        f"INSERT INTO arc.{table} ({shared}) SELECT {shared} FROM main.{table} "
+                        f"WHERE scraped_at >= ? AND scraped_at < ?",
+                        (month_start, month_end)
+                    )
+                    cursor.execute(
+                        f"DELETE FROM main.{table} WHERE scraped_at >= ? AND scraped_at < ?",
+                        (month_start, month_end)
+                    )
+                    moved[table] += cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cursor.execute("DETACH DATABASE arc")
+        conn.close()
+        return moved
+
+    def compact_database(self, max_pages: int = 1000, convert: bool = False) -> Dict[str, Any]:
+        """
+        يستعيد المساحة الفارغة على دفعات صغيرة (incremental_vacuum) مع تثبيت كل دفعة، فلا تُقفل
+        القاعدة طويلاً أمام مهام الاستخراج في الخلفية.
+
+        القواعد الجديدة تُنشأ بوضع auto_vacuum=INCREMENTAL. القواعد القديمة تحتاج تحويلاً لمرة
+        واحدة بـ VACUUM كامل يقفل القاعدة طوال مدته، لذلك لا يتم إلا عند طلبه صراحة (convert=True،
+        أو cli.py maintenance --convert-vacuum)؛ بدونه لا يُستعاد شيء في تلك القواعد.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        freelist_before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        incremental = cursor.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        if not incremental and not convert:
+            conn.close()
+            return {"freed_pages": 0, "free_pages": freelist_before, "incremental": False}
+        if not incremental:
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            cursor.execute("VACUUM")
+        else:
+            remaining = freelist_before
+            while remaining > 0:
+                cursor.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+                conn.commit()
+                remaining = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        cursor.execute("PRAGMA optimize")
+        freelist_after = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.close()
+        return {"freed_pages": freelist_before - freelist_after, "free_pages": freelist_after, "incremental": True}
+
+    def run_maintenance(self, retention_months: int = 6, convert_vacuum: bool = False) -> Dict[str, Any]:
+        moved = self.archive_old_data(retention_months)
+        compacted = self.compact_database(convert=convert_vacuum)
+        return {"archived": moved, **compacted}
+
+    # background scrape jobs
+    def create_scrape_job(self, urls: List[str], owner: Optional[str] = None) -> int:
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO scrape_jobs (status, urls_json, total_urls, owner, heartbeat_at)
+            VALUES ('queued', ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (json.dumps(urls, ensure_ascii=False), len(urls), owner))
+        job_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        return job_id
+
+    def start_scrape_job(self, job_id: int):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE scrape_jobs SET status = 'running', started_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (job_id,))
+        conn.commit()
+        conn.close()
+
+    def update_scrape_job_progress(self, job_id: int, completed: int, failed: int, elapsed: float):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT total_urls FROM scrape_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        total = row[0] if row else 0
+        processed = completed + failed
+        # الإنتاجية بعدد الروابط في الدقيقة، والوقت المتبقي تقديري على أساسها
+        throughput = processed / elapsed * 60 if elapsed > 0 else 0
+        eta = (total - processed) / (throughput / 60) if throughput > 0 else None
+        # إذا فشل start_scrape_job تبقى الحالة queued؛ أول تحديث للتقدم يصححها
+        cursor.execute("""
+            UPDATE scrape_jobs
+            SET completed_urls = ?, failed_urls = ?, throughput = ?, eta_seconds = ?,
+                status = CASE WHEN status = 'queued' THEN 'running' ELSE status END,
+                started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+            WHERE id = ?
+        """, (completed, failed, round(throughput, 2), round(eta, 1) if eta is not None else None, job_id))
+        conn.commit()
+        conn.close()
+
+    def finish_scrape_job(self, job_id: int, status: str, error_message: Optional[str] = None):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE scrape_jobs
+            SET status = ?, error_message = ?, eta_seconds = 0, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, error_message, job_id))
+        conn.commit()
+        conn.close()
+
+    def heartbeat_scrape_jobs(self, owner: str, job_ids: List[int]) -> int:
+        """
+        تحديث نبض الحياة للمهام التي ما زالت هذه العملية تنفّذها فعلاً (job_ids) فقط؛
+        مهمة عالقة في القاعدة لم تعد في ذاكرة العملية يتوقف نبضها فتُعلَّم interrupted.
+        """
+        if not job_ids:
+            return 0
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        placeholders = ",".join("?" * len(job_ids))
+        cursor.execute(f"""
+            UPDATE scrape_jobs SET heartbeat_at = CURRENT_TIMESTAMP
+            WHERE owner = ? AND status IN ('queued', 'running') AND id IN ({placeholders})
+        """, (owner, *job_ids))
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    def mark_interrupted_jobs(self, stale_after_seconds: int = 120) -> int:
+        """
+        المهام queued/running التي توقف نبض حياتها منذ stale_after_seconds تخص عملية انتهت
+        ولن تكتمل أبداً؛ نعلّمها كفاشلة. مهام العمليات الحية (ومنها عمليات Streamlit أخرى على
+        القاعدة نفسها) تحدّث نبضها دورياً فلا تتأثر.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE scrape_jobs
+            SET status = 'failed', error_message = 'interrupted', finished_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+              AND COALESCE(heartbeat_at, created_at) < datetime('now', ?)
+        """, (f"-{int(stale_after_seconds)} seconds",))
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+    def get_scrape_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        conn = self._get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM scrape_jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+    def get_scrape_jobs(self, limit: int = 50) -> "pd.DataFrame":
+        query = """
+            SELECT id, status, total_urls, completed_urls, failed_urls, throughput, eta_seconds,
+                   error_message, owner, created_at, started_at, finished_at, heartbeat_at
+            FROM scrape_jobs ORDER BY id DESC LIMIT ?
+        """
+        return self._read_sql_query(query, (limit,))
+
+    # training dataset builder support
+    def iter_training_rows(self, batch_size: int = 500, training_ready_only: bool = True):
+        """
+        يعيد صفوف enhanced_training_data كقواميس على دفعات دون تحميل الجدول كاملاً.
+        كل دفعة استعلام مستقل (WHERE id > آخر id) حتى لا يبقى قفل قراءة مفتوحاً أثناء الكتابة.
+        """
+        # إعادة استخراج المنشور تضيف صفاً جديداً؛ نأخذ أحدث صف لكل post_url فقط
+        query = """
+            SELECT id, post_url, title, main_content, comments_json FROM enhanced_training_data AS e
+            WHERE id > ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM enhanced_training_data AS newer
+                  WHERE newer.post_url = e.post_url AND newer.id > e.id
+              )
+        """
+        if training_ready_only:
+            query += " AND training_ready = 1"
+        query += " ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            conn = self._get_connection()
+            conn.row_factory = sqlite3.Row
+            rows = [dict(row) for row in conn.execute(query, (last_id, batch_size)).fetchall()]
+            conn.close()
+            if not rows:
+                break
+            yield rows
+            last_id = rows[-1]["id"]
+
+    def get_token_counts(self, row_ids: List[int], tokenizer: str) -> Dict[int, Dict[str, Any]]:
+        if not row_ids:
+            return {}
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        placeholders = ", ".join("?" for _ in row_ids)
+        cursor.execute(f"""
+            SELECT row_id, content_hash, prompt_tokens, comment_tokens_json FROM token_counts
+            WHERE tokenizer = ? AND row_id IN ({placeholders})
+        """, (tokenizer, *row_ids))
+        counts = {
+            row_id: {"content_hash": content_hash, "prompt_tokens": prompt_tokens,
+                     "comment_tokens": json.loads(comment_tokens_json)}
+            for row_id, content_hash, prompt_tokens, comment_tokens_json in cursor.fetchall()
+        }
+        conn.close()
+        return counts
+
+    def save_token_counts(self, counts: List[Dict[str, Any]], tokenizer: str):
+        if not counts:
+            return
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT OR REPLACE INTO token_counts (row_id, tokenizer, content_hash, prompt_tokens, comment_tokens_json)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (c["row_id"], tokenizer, c["content_hash"], c["prompt_tokens"], json.dumps(c["comment_tokens"]))
+            for c in counts
+        ])
+        conn.commit()
+        conn.close()
+
     def export_to_jsonl(self, filename="training_data.jsonl"):
-        df = self.get_enhanced_training_data(limit=1000000)
+        # قراءة الصفوف مباشرة من SQLite بدلاً من DataFrame حتى لا يتطلب التصدير تحميل pandas
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT main_content, comments_json FROM enhanced_training_data ORDER BY extracted_at DESC")
         with open(filename, "w", encoding="utf-8") as f:
-            for _, row in df.iterrows():
-                comments = json.loads(row["comments_json"] or "[]")
-                completion = "\\n".join([c.get("content","") for c in comments]) if comments else ""
+            for main_content, comments_json in cursor:
+                comments = json.loads(comments_json or "[]")
+                completion = "\n".join([c.get("content","") for c in comments]) if comments else ""
                 record = {
-                    "prompt": row.get("main_content","")[:3000],
+                    "prompt": (main_content or "")[:3000],
                     "completion": completion
                 }
-                f.write(json.dumps(record, ensure_ascii=False) + "\\n")
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        conn.close()
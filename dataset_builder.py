@@ -0,0 +1,248 @@
+"""
+بناء مجموعة بيانات التدريب من enhanced_training_data بشكل متدفق.
+
+- تُقرأ الصفوف على دفعات (Database.iter_training_rows) دون تحميل الجدول في الذاكرة.
+- عدد الرموز (tokens) لكل صف يُخزَّن في جدول token_counts مع بصمة المحتوى، فلا يُعاد
+  الترميز في التشغيلات اللاحقة إلا للصفوف الجديدة أو المعدّلة.
+- كل سجل يُقتطع/يُعبّأ ضمن ميزانية رموز: يُقتطع نص المنشور إلى max_prompt_tokens،
+  ثم تُضاف التعليقات بالترتيب ما دامت تتسع في الميزانية المتبقية.
+- التقسيم train/val/test حتمي بحسب بصمة post_url، فيبقى كل منشور في القسم نفسه عبر التشغيلات.
+- ملفات الأجزاء (shards) تُكتب بالتوازي في عمليات منفصلة.
+
+    python cli.py build-dataset --output-dir dataset --max-tokens 2048
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import Database
+
+SPLITS = ("train", "val", "test")
+COMMENT_SEPARATOR = "\n"
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class RegexTokenizer:
+    """مُرمِّز تقريبي بلا اعتماديات: كل كلمة أو علامة ترقيم رمز واحد."""
+
+    name = "regex"
+
+    def count(self, text: str) -> int:
+        return sum(1 for _ in _TOKEN_RE.finditer(text or ""))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        for i, match in enumerate(_TOKEN_RE.finditer(text or ""), 1):
+            if i == max_tokens:
+                return text[:match.end()]
+        return text or ""
+
+
+class TiktokenTokenizer:
+    """مُرمِّز tiktoken (اختياري، يُستخدم فقط إذا كانت المكتبة مثبتة)."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+
+        self.name = f"tiktoken:{encoding}"
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode(text or ""))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self._encoding.encode(text or "")
+        return text if len(tokens) <= max_tokens else self._encoding.decode(tokens[:max(max_tokens, 0)])
+
+
+def get_tokenizer(name: str = "regex"):
+    if name == "regex":
+        return RegexTokenizer()
+    if name.startswith("tiktoken"):
+        _, _, encoding = name.partition(":")
+        return TiktokenTokenizer(encoding or "cl100k_base")
+    raise ValueError(f"Unknown tokenizer: {name}")
+
+
+def assign_split(post_url: str, ratios: Tuple[float, float, float] = (0.9, 0.05, 0.05)) -> str:
+    """يحدد القسم من بصمة الرابط؛ النتيجة ثابتة لنفس الرابط ونفس النسب."""
+    digest = hashlib.sha256((post_url or "").encode("utf-8")).digest()
+    bucket = int.from_bytes(digest[:8], "big") / 2 ** 64
+    threshold = 0.0
+    for split, ratio in zip(SPLITS, ratios):
+        threshold += ratio
+        if bucket < threshold:
+            return split
+    return SPLITS[-1]
+
+
+def _row_hash(row: Dict[str, Any]) -> str:
+    payload = "\x1f".join([row.get("title") or "", row.get("main_content") or "", row.get("comments_json") or ""])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _prompt_text(row: Dict[str, Any]) -> str:
+    title = (row.get("title") or "").strip()
+    content = (row.get("main_content") or "").strip()
+    return f"{title}\n\n{content}" if title else content
+
+
+def _comment_texts(row: Dict[str, Any]) -> List[str]:
+    try:
+        comments = json.loads(row.get("comments_json") or "[]")
+    except ValueError:
+        return []
+    texts = [(c.get("content") or "").strip() for c in comments if isinstance(c, dict)]
+    return [t for t in texts if t]
+
+
+def _build_record(row, tokenizer, counts, max_tokens, max_prompt_tokens) -> Optional[Dict[str, Any]]:
+    prompt = _prompt_text(row)
+    comments = _comment_texts(row)
+
+    prompt_tokens = counts["prompt_tokens"]
+    if prompt_tokens > max_prompt_tokens:
+        prompt = tokenizer.truncate(prompt, max_prompt_tokens)
+        prompt_tokens = max_prompt_tokens
+
+    # تعبئة التعليقات: كل تعليق يتسع في الميزانية المتبقية يُضاف، والباقي يُتجاهل
+    budget = max_tokens - prompt_tokens
+    packed, completion_tokens = [], 0
+    for text, n_tokens in zip(comments, counts["comment_tokens"]):
+        if completion_tokens + n_tokens <= budget:
+            packed.append(text)
+            completion_tokens += n_tokens
+    if not packed:
+        return None
+
+    return {
+        "id": row["post_url"],
+        "prompt": prompt,
+        "completion": COMMENT_SEPARATOR.join(packed),
+        "num_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _write_shard(split: str, index: int, rows: List[Dict[str, Any]], output_dir: str, tokenizer_name: str,
+                 max_tokens: int, max_prompt_tokens: int, min_tokens: int) -> Dict[str, Any]:
+    """يعمل داخل عملية منفصلة: يرمّز ما ينقصه عدّ، ويكتب ملف الجزء، ويعيد الإحصائيات والأعداد الجديدة."""
+    tokenizer = get_tokenizer(tokenizer_name)
+    path = os.path.join(output_dir, f"{split}-{index:05d}.jsonl")
+    new_counts, written, skipped, total_tokens = [], 0, 0, 0
+
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            counts = row.pop("_counts", None)
+            if counts is None:
+                counts = {
+                    "row_id": row["id"],
+                    "content_hash": row["_hash"],
+                    "prompt_tokens": tokenizer.count(_prompt_text(row)),
+                    "comment_tokens": [tokenizer.count(t) for t in _comment_texts(row)],
+                }
+                new_counts.append(counts)
+
+            record = _build_record(row, tokenizer, counts, max_tokens, max_prompt_tokens)
+            if record is None or record["num_tokens"] < min_tokens:
+                skipped += 1
+                continue
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+            total_tokens += record["num_tokens"]
+
+    return {"split": split, "path": path, "records": written, "skipped": skipped,
+            "tokens": total_tokens, "new_counts": new_counts}
+
+
+def build_dataset(
+    db: Database,
+    output_dir: str = "dataset",
+    max_tokens: int = 2048,
+    max_prompt_tokens: Optional[int] = None,
+    min_tokens: int = 32,
+    ratios: Tuple[float, float, float] = (0.9, 0.05, 0.05),
+    shard_size: int = 1000,
+    workers: Optional[int] = None,
+    tokenizer: str = "regex",
+    training_ready_only: bool = True,
+) -> Dict[str, Any]:
+    """يبني ملفات JSONL مقسّمة إلى train/val/test ويعيد ملخصاً (يُحفظ أيضاً في manifest.json)."""
+    if abs(sum(ratios) - 1.0) > 1e-6:
+        raise ValueError("split ratios must sum to 1")
+    max_prompt_tokens = max_prompt_tokens or max_tokens * 3 // 4
+    get_tokenizer(tokenizer)  # التحقق من توفر المرمِّز قبل تشغيل العمال
+
+    os.makedirs(output_dir, exist_ok=True)
+    # حذف أجزاء التشغيل السابق حتى لا تبقى ملفات قديمة بجانب الجديدة؛ أسماء الأقسام فقط،
+    # فلا يُحذف أي ملف آخر إذا كان output_dir مجلداً مشتركاً
+    for split in SPLITS:
+        for old in glob.glob(os.path.join(output_dir, f"{split}-[0-9]*.jsonl")):
+            os.remove(old)
+
+    stats = {split: {"records": 0, "skipped": 0, "tokens": 0, "shards": []} for split in SPLITS}
+    buffers: Dict[str, List[Dict[str, Any]]] = {split: [] for split in SPLITS}
+    shard_index = {split: 0 for split in SPLITS}
+    cached_rows = 0
+    workers = workers or os.cpu_count() or 1
+    pending = []
+
+    def _collect(future):
+        result = future.result()
+        split_stats = stats[result["split"]]
+        split_stats["records"] += result["records"]
+        split_stats["skipped"] += result["skipped"]
+        split_stats["tokens"] += result["tokens"]
+        split_stats["shards"].append(os.path.basename(result["path"]))
+        db.save_token_counts(result["new_counts"], tokenizer)
+
+    def _submit(executor, split):
+        rows, buffers[split] = buffers[split], []
+        pending.append(executor.submit(
+            _write_shard, split, shard_index[split], rows, output_dir, tokenizer,
+            max_tokens, max_prompt_tokens, min_tokens
+        ))
+        shard_index[split] += 1
+        # عدد محدود من الأجزاء قيد التنفيذ حتى تبقى الذاكرة ثابتة مع كبر الجدول
+        while len(pending) > workers * 2:
+            _collect(pending.pop(0))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in db.iter_training_rows(batch_size=shard_size, training_ready_only=training_ready_only):
+            cache = db.get_token_counts([row["id"] for row in batch], tokenizer)
+            for row in batch:
+                row["_hash"] = _row_hash(row)
+                cached = cache.get(row["id"])
+                if cached and cached["content_hash"] == row["_hash"]:
+                    row["_counts"] = cached
+                    cached_rows += 1
+                split = assign_split(row["post_url"], ratios)
+                buffers[split].append(row)
+                if len(buffers[split]) >= shard_size:
+                    _submit(executor, split)
+
+        for split in SPLITS:
+            if buffers[split]:
+                _submit(executor, split)
+        while pending:
+            _collect(pending.pop(0))
+
+    for split_stats in stats.values():
+        split_stats["shards"].sort()
+    manifest = {
+        "tokenizer": tokenizer,
+        "max_tokens": max_tokens,
+        "max_prompt_tokens": max_prompt_tokens,
+        "min_tokens": min_tokens,
+        "ratios": dict(zip(SPLITS, ratios)),
+        "cached_rows": cached_rows,
+        "splits": stats,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
@@ -0,0 +1,391 @@
+"""
+اكتشاف روابط المنشورات من مصادر خفيفة بدلاً من عرض صفحات التصنيف في Chromium.
+
+ترتيب المصادر:
+1. خلاصات RSS/Atom للتصنيف.
+2. خرائط الموقع (sitemap.xml وما يُذكر في robots.txt) مع تصفية الروابط حسب مسار التصنيف.
+3. صفحات التصنيف كـ HTML عادي عبر HTTP (بدون تنفيذ JavaScript).
+4. الزحف المعروض عبر Playwright (scrape_category) فقط إذا لم تُرجع المصادر السابقة شيئاً.
+
+تُقرأ الخلاصات وخرائط الموقع بشكل متدفق (iterparse) فلا يُحمَّل الملف كاملاً في الذاكرة،
+وكل منشور يُعاد كقاموس {"url", "lastmod", "source"} حيث lastmod بصيغة ISO أو None.
+يمكن تمرير مسارات ملفات محلية بدلاً من الروابط (مفيد للاختبار بملفات ثابتة).
+"""
+import codecs
+import heapq
+import sys
+import time
+from collections import deque
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urljoin, urlparse
+
+from scraper import HEADERS
+
+BASE_URL = "https://io.hsoub.com"
+LISTING_TITLE_CLASSES = ("post-title", "idea-title")
+LISTING_ITEM_CLASSES = ("post-item", "idea-item")
+CHUNK_SIZE = 64 * 1024
+# عدد المنشورات التقريبي في صفحة التصنيف؛ يُستخدم لتحويل "عدد الصفحات" إلى حد أقصى للروابط
+LISTING_PAGE_SIZE = 20
+# الحد الأقصى لملفات خرائط الموقع (الفهرس + الفرعية) التي تُجلب لكل مصدر
+MAX_SITEMAP_FILES = 5
+
+
+def _is_local(source: str) -> bool:
+    return urlparse(source).scheme in ("", "file")
+
+
+class _Stream:
+    """يفتح مصدراً (رابط HTTP أو ملف محلي) ككائن قابل للقراءة المتدفقة."""
+
+    def __init__(self, source: str, timeout: float = 15.0):
+        self.source = source
+        self.timeout = timeout
+        self._response = None
+        self._file = None
+
+    def __enter__(self):
+        if _is_local(self.source):
+            path = urlparse(self.source).path if self.source.startswith("file:") else self.source
+            self._file = open(path, "rb")
+            return self._file
+
+        import requests
+
+        self._response = requests.get(self.source, headers=HEADERS, stream=True, timeout=self.timeout)
+        self._response.raise_for_status()
+        self._response.raw.decode_content = True
+        return self._response.raw
+
+    def __exit__(self, *exc):
+        if self._file:
+            self._file.close()
+        if self._response is not None:
+            self._response.close()
+        return False
+
+
+def _local_name(tag: str) -> str:
+    # إزالة مساحة الأسماء: {http://www.w3.org/2005/Atom}entry -> entry
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _normalize_date(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _log(message: str):
+    # الرسائل التشخيصية إلى stderr حتى يبقى stdout للروابط فقط (cli.py discover > urls.txt)
+    print(message, file=sys.stderr)
+
+
+def _first(children: List[ET.Element], *names: str) -> Optional[ET.Element]:
+    for child in children:
+        if _local_name(child.tag) in names:
+            return child
+    return None
+
+
+def _entry_link(children: List[ET.Element]) -> Optional[str]:
+    """
+    رابط العنصر: في Atom قد توجد عدة <link>، والمطلوب منها ما ليس له rel أو rel="alternate"
+    (وليس replies/enclosure...). في RSS الرابط نص العنصر، ثم guid كبديل.
+    """
+    for child in children:
+        if _local_name(child.tag) != "link":
+            continue
+        if child.get("rel", "alternate") != "alternate":
+            continue
+        link = child.get("href") or (child.text or "").strip()
+        if link:
+            return link
+    guid = _first(children, "guid")
+    if guid is not None and (guid.text or "").strip():
+        return guid.text.strip()
+    return None
+
+
+def iter_feed(source: str) -> Iterator[Dict]:
+    """يقرأ خلاصة RSS أو Atom بشكل متدفق ويعيد روابط العناصر مع تاريخ آخر تعديل."""
+    with _Stream(source) as stream:
+        for _, elem in ET.iterparse(stream, events=("end",)):
+            name = _local_name(elem.tag)
+            if name not in ("item", "entry"):
+                continue
+            children = list(elem)
+            link = _entry_link(children)
+            date_el = _first(children, "updated", "pubdate", "published")
+            if link:
+                yield {
+                    "url": urljoin(BASE_URL if _is_local(source) else source, link),
+                    "lastmod": _normalize_date(date_el.text if date_el is not None else None),
+                    "source": "feed",
+                }
+            elem.clear()
+
+
+def _category_slug(category_url: Optional[str]) -> str:
+    return urlparse(category_url).path.strip("/").rsplit("/", 1)[-1] if category_url else ""
+
+
+def _pick_nested(nested: List[tuple], since_iso: Optional[str], category_url: Optional[str]) -> List[str]:
+    """
+    يختار خرائط الموقع الفرعية التي تستحق الجلب: يتجاهل ما lastmod له أقدم من since،
+    ويقتصر على خرائط التصنيف إن وُجدت (مثل sitemap-programming.xml)، ثم الأحدث أولاً.
+    """
+    nested = [(loc, lastmod) for loc, lastmod in nested if not (since_iso and lastmod and lastmod < since_iso)]
+    slug = _category_slug(category_url)
+    if slug:
+        matching = [item for item in nested if slug in urlparse(item[0]).path]
+        if matching:
+            nested = matching
+    nested.sort(key=lambda item: item[1] or "", reverse=True)
+    return [loc for loc, _ in nested]
+
+
+def iter_sitemap(source: str, max_depth: int = 2, since: Optional[str] = None,
+                 category_url: Optional[str] = None, max_files: int = MAX_SITEMAP_FILES) -> Iterator[Dict]:
+    """
+    يقرأ sitemap (أو sitemapindex) بشكل متدفق، ويتبع خرائط الموقع الفرعية حتى max_depth.
+
+    لا يُجلب أكثر من max_files ملفاً (بما فيها source)، وتُقدَّم الخرائط الفرعية الخاصة
+    بالتصنيف والأحدث من since (انظر _pick_nested) حتى لا يُنزَّل الموقع كاملاً.
+    """
+    since_iso = _normalize_date(since)
+    queue = deque([(source, max_depth)])
+    fetched = 0
+    while queue and fetched < max_files:
+        url, depth = queue.popleft()
+        fetched += 1
+        nested: List[tuple] = []
+        try:
+            with _Stream(url) as stream:
+                for _, elem in ET.iterparse(stream, events=("end",)):
+                    name = _local_name(elem.tag)
+                    if name not in ("url", "sitemap"):
+                        continue
+                    children = list(elem)
+                    loc_el = _first(children, "loc")
+                    loc = (loc_el.text or "").strip() if loc_el is not None else ""
+                    lastmod_el = _first(children, "lastmod")
+                    lastmod = _normalize_date(lastmod_el.text if lastmod_el is not None else None)
+                    if loc:
+                        if name == "sitemap":
+                            nested.append((loc, lastmod))
+                        else:
+                            yield {"url": loc, "lastmod": lastmod, "source": "sitemap"}
+                    elem.clear()
+        except Exception as e:
+            # فشل المصدر نفسه يُرفع للمستدعي؛ فشل خريطة فرعية يُسجَّل فقط
+            if url == source:
+                raise
+            _log(f"Sitemap error ({url}): {e}")
+            continue
+
+        if depth > 0:
+            queue.extend((loc, depth - 1) for loc in _pick_nested(nested, since_iso, category_url))
+
+
+class _ListingParser(HTMLParser):
+    """يجمع روابط عناوين المنشورات من صفحة تصنيف دون الحاجة إلى BeautifulSoup."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[str] = []
+        self.item_count = 0
+        self._title_tags: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        if any(c in LISTING_ITEM_CLASSES for c in classes):
+            self.item_count += 1
+        if any(c in LISTING_TITLE_CLASSES for c in classes):
+            self._title_tags.append(tag)
+        elif tag == "a" and self._title_tags and attrs.get("href"):
+            self.links.append(attrs["href"])
+
+    def handle_endtag(self, tag):
+        if self._title_tags and self._title_tags[-1] == tag:
+            self._title_tags.pop()
+
+
+def iter_listing_html(category_url: str, pages: int = 1, delay: float = 1.0) -> Iterator[Dict]:
+    """يجلب صفحات التصنيف كـ HTML عادي ويحللها على دفعات أثناء التنزيل."""
+    for i in range(1, pages + 1):
+        url = f"{category_url}?page={i}" if i > 1 else category_url
+        parser = _ListingParser()
+        # مفكك تزايدي حتى لا ينقسم حرف عربي متعدد البايتات بين دفعتين
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        with _Stream(url) as stream:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+
+        for href in parser.links:
+            yield {"url": urljoin(BASE_URL, href), "lastmod": None, "source": "listing"}
+
+        # صفحة بلا منشورات تعني نهاية الصفحات (أو أن المحتوى يُعرض بـ JavaScript)
+        if not parser.item_count:
+            break
+        if i < pages:
+            time.sleep(delay)
+
+
+def default_feed_urls(category_url: str) -> List[str]:
+    category_url = category_url.rstrip("/")
+    return [f"{category_url}.rss", f"{category_url}/feed", f"{category_url}.atom"]
+
+
+def default_sitemap_urls(category_url: str) -> Iterator[str]:
+    """
+    sitemap.xml في جذر الموقع أولاً، ثم ما يذكره robots.txt. المولّد كسول: robots.txt لا يُجلب
+    إلا إذا طلب المستدعي مصدراً آخر (أي لم تستجب sitemap.xml).
+    """
+    parsed = urlparse(category_url)
+    root = f"{parsed.scheme}://{parsed.netloc}" if parsed.netloc else BASE_URL
+    default = f"{root}/sitemap.xml"
+    yield default
+    try:
+        import requests
+
+        resp = requests.get(f"{root}/robots.txt", headers=HEADERS, timeout=10)
+        if not resp.ok:
+            return
+        lines = resp.text.splitlines()
+    except Exception as e:
+        _log(f"robots.txt error: {e}")
+        return
+    listed = [line.split(":", 1)[1].strip() for line in lines if line.lower().startswith("sitemap:")]
+    for url in dict.fromkeys(listed):
+        if url != default:
+            yield url
+
+
+def _in_category(url: str, category_url: str) -> bool:
+    prefix = urlparse(category_url).path.rstrip("/") + "/"
+    return urlparse(url).path.startswith(prefix)
+
+
+def _newest(posts: Iterable[Dict], limit: int) -> List[Dict]:
+    """
+    أحدث limit منشوراً حسب lastmod (بلا تاريخ = الأقدم) مع ذاكرة محدودة بـ limit.
+    خرائط الموقع غالباً مرتبة من الأقدم، لذلك لا يكفي أخذ أول limit عنصراً منها.
+    """
+    heap = []
+    for i, post in enumerate(posts):
+        item = (post["lastmod"] or "", -i, post)
+        if len(heap) < limit:
+            heapq.heappush(heap, item)
+        elif item[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, item)
+    return [post for *_, post in sorted(heap, key=lambda item: item[:2], reverse=True)]
+
+
+def discover_posts(
+    category_url: str,
+    pages: int = 1,
+    delay: float = 1.0,
+    feeds: Optional[Iterable[str]] = None,
+    sitemaps: Optional[Iterable[str]] = None,
+    since: Optional[str] = None,
+    fallback: bool = True,
+    limit: Optional[int] = None,
+) -> Iterator[Dict]:
+    """
+    يعيد روابط منشورات التصنيف من أخف مصدر متاح، بدون تكرار.
+
+    feeds/sitemaps: قوائم مصادر صريحة (روابط أو ملفات محلية)؛ عند تركها تُستخدم المواقع الافتراضية.
+    since: تاريخ ISO؛ المنشورات ذات lastmod أقدم منه تُتجاهل (للزحف التزايدي).
+    fallback: استخدام الزحف المعروض عبر Playwright إذا لم يستجب أي مصدر آخر.
+    limit: الحد الأقصى لعدد الروابط (الافتراضي pages × LISTING_PAGE_SIZE).
+
+    ينتقل إلى المصدر التالي فقط إذا لم يُرجع المصدر الحالي أي عنصر. إذا أرجع عناصر كلها
+    أقدم من since فهذا يعني "لا جديد" ولا داعي للمصادر الأغلى.
+    """
+    since_iso = _normalize_date(since)
+    limit = limit or pages * LISTING_PAGE_SIZE
+    seen = set()
+    responded = False
+
+    def _accept(post: Dict) -> bool:
+        if post["url"] in seen or len(seen) >= limit:
+            return False
+        if since_iso and post["lastmod"] and post["lastmod"] < since_iso:
+            return False
+        seen.add(post["url"])
+        return True
+
+    def _mark(posts: Iterable[Dict]) -> Iterator[Dict]:
+        nonlocal responded
+        for post in posts:
+            responded = True
+            yield post
+
+    # المصادر الافتراضية بدائل لنفس الخلاصة/الخريطة، فيكفي أول ما يستجيب منها؛
+    # أما المصادر الصريحة فتُقرأ كلها
+    feed_sources = list(feeds) if feeds is not None else default_feed_urls(category_url)
+    for source in feed_sources:
+        try:
+            for post in _mark(iter_feed(source)):
+                if _accept(post):
+                    yield post
+                if len(seen) >= limit:
+                    return
+        except Exception as e:
+            _log(f"Feed unavailable ({source}): {e}")
+        if responded and feeds is None:
+            break
+    if responded:
+        return
+
+    sitemap_sources = list(sitemaps) if sitemaps is not None else default_sitemap_urls(category_url)
+    for source in sitemap_sources:
+        try:
+            in_category = (p for p in iter_sitemap(source, since=since, category_url=category_url)
+                           if _in_category(p["url"], category_url))
+            for post in _newest(_mark(in_category), limit):
+                if _accept(post):
+                    yield post
+        except Exception as e:
+            _log(f"Sitemap unavailable ({source}): {e}")
+        if responded and sitemaps is None:
+            break
+    if responded:
+        return
+
+    try:
+        for post in _mark(iter_listing_html(category_url, pages=pages, delay=delay)):
+            if _accept(post):
+                yield post
+    except Exception as e:
+        _log(f"Listing HTML unavailable ({category_url}): {e}")
+    if responded or not fallback:
+        return
+
+    from scraper import scrape_category
+
+    for url in scrape_category(category_url, pages=pages, delay=delay):
+        post = {"url": url, "lastmod": None, "source": "rendered"}
+        if _accept(post):
+            yield post
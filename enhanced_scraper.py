@@ -1,3 +1,5 @@
+from typing import Optional
+
 from scraper import scrape_hsoub_io
 from database import Database
 
@@ -22,11 +24,11 @@ def _evaluate_content(data):
         
     return quality_score, question_type
 
-def scrape_post(url: str):
+def scrape_post(url: str, db: Optional[Database] = None):
     """
     تقوم باستخراج منشور واحد، وتقييمه، وحفظه في جدول بيانات التدريب المحسنة.
     """
-    db = Database()
+    db = db or Database()
     
     # 1. استخراج البيانات الأولية
     scraped_data_list = scrape_hsoub_io(url)
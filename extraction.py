@@ -0,0 +1,301 @@
+"""
+محرك قواعد استخراج مُجمَّعة يطبّق جميع القواعد في مرور واحد على شجرة المستند.
+
+كل قاعدة (Rule) تربط اسم حقل بقائمة محددات CSS بديلة (fallback) مرتبة، مع معالجة لاحقة
+اختيارية وقواعد متداخلة تُطبَّق داخل العنصر المطابق فقط (مثل حقول كل تعليق).
+تُجمَّع المحددات مرة واحدة، ثم يُزار كل عنصر في المستند مرة واحدة بدلاً من استدعاء
+soup.select لكل حقل، مع عدّادات لكل محدد تبيّن أي البدائل تُستخدم فعلاً.
+المحددات البسيطة (وسوم وأصناف ومسافة بينها) تُطابق مباشرة أثناء المرور بتتبع ما تحقق في
+الأسلاف؛ وما عداها (مثل محددات السمات) يُفوَّض إلى soupsieve بعد فحص مسبق رخيص.
+
+دلالات المطابقة مطابقة لـ BeautifulSoup:
+- many=False: أول عنصر بترتيب المستند يطابق أياً من البدائل (مثل select_one(".a, .b")).
+- many=True: كل العناصر المطابقة بترتيب المستند (مثل select(".a, .b")).
+- القواعد المتداخلة تبحث في أحفاد العنصر المطابق فقط (مثل el.select_one(...)).
+"""
+import itertools
+import re
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+_COMBINATOR_RE = re.compile(r"\s*[>+~]\s*|\s+")
+_BRACKETS_RE = re.compile(r"\[[^\]]*\]|\([^)]*\)")
+_KEY_RE = re.compile(r"^([a-zA-Z][\w-]*)?(?:\.([\w-]+))?")
+_COMPOUND_RE = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+)*)$")
+
+
+class Rule:
+    def __init__(self, name: str, selectors: Sequence[str], many: bool = False,
+                 post: Optional[Callable[[Any], Any]] = None, rules: Sequence["Rule"] = ()):
+        self.name = name
+        self.selectors = list(selectors)
+        self.many = many
+        self.post = post
+        self.rules = list(rules)
+
+
+def _rightmost_key(selector: str):
+    """
+    يستخرج اسم الوسم و/أو الصنف المطلوبين في آخر جزء من المحدد كشرط مسبق رخيص:
+    العنصر الذي لا يحققهما لا يمكن أن يطابق، فلا داعي لاستدعاء soupsieve عليه.
+    """
+    # إزالة [سمات] و(وسائط) أولاً لأنها قد تحتوي مسافات أو رموزاً تربك التقسيم
+    last = _COMBINATOR_RE.split(_BRACKETS_RE.sub("", selector).strip())[-1]
+    tag, cls = _KEY_RE.match(last).groups()
+    return (tag.lower() if tag else None), ((cls,) if cls else ())
+
+
+def _parse_chain(selector: str):
+    """
+    يحلل المحددات البسيطة (وسوم وأصناف يفصلها مسافة فقط، مثل ".comments .comment-item")
+    إلى سلسلة [(tag, classes), ...] تُطابق أثناء المرور دون soupsieve. غير ذلك يعيد None.
+    """
+    parts = selector.split()
+    chain = []
+    for part in parts:
+        m = _COMPOUND_RE.match(part)
+        if not m or not part:
+            return None
+        tag, classes = m.groups()
+        chain.append((tag.lower() if tag else None, tuple(c for c in classes.split(".") if c)))
+    return chain or None
+
+
+def _compound_matches(el, classes, tag, required) -> bool:
+    if tag and el.name != tag:
+        return False
+    for cls in required:
+        if cls not in classes:
+            return False
+    return True
+
+
+class _Selector:
+    def __init__(self, selector: str, chain_id: int):
+        self.text = selector
+        self.chain_id = chain_id
+        self.chain = _parse_chain(selector)
+        if self.chain is None:
+            import soupsieve
+
+            self.tag, self.classes = _rightmost_key(selector)
+            self.compiled = soupsieve.compile(selector)
+        else:
+            self.tag, self.classes = self.chain[-1]
+            self.compiled = None
+
+    def match(self, el, classes, ancestors) -> bool:
+        if not _compound_matches(el, classes, self.tag, self.classes):
+            return False
+        if self.compiled is not None:
+            return bool(self.compiled.match(el))
+        # "A B": يكفي أن يكون الجزء السابق من السلسلة قد تحقق في أحد الأسلاف
+        return len(self.chain) == 1 or (self.chain_id, len(self.chain) - 2) in ancestors
+
+
+def _index_key(tag, classes):
+    # مفتاح فهرسة واحد يكفي كشرط لازم: الوسم إن وُجد، وإلا أول صنف، وإلا None (أي عنصر)
+    if tag:
+        return ("t", tag)
+    if classes:
+        return ("c", classes[0])
+    return None
+
+
+def _element_keys(el, classes):
+    return [("t", el.name)] + [("c", cls) for cls in classes]
+
+
+class _Index:
+    """فهرس (وسم/صنف ← عناصر) حتى لا يُفحص كل عنصر في المستند إلا مقابل ما قد يطابقه."""
+
+    def __init__(self):
+        self.by_key: Dict[Any, list] = {}
+        self.wildcard: list = []
+
+    def add(self, key, item):
+        bucket = self.wildcard if key is None else self.by_key.setdefault(key, [])
+        if item not in bucket:
+            bucket.append(item)
+
+    def lookup(self, keys) -> list:
+        # القائمة المعادة قد تكون مشتركة مع الفهرس؛ للقراءة فقط
+        found = self.wildcard
+        for key in keys:
+            bucket = self.by_key.get(key)
+            if bucket:
+                found = found + bucket if found else bucket
+        return found
+
+
+def _rule_index(rules) -> _Index:
+    index = _Index()
+    for compiled in rules:
+        for selector in compiled.alternatives:
+            index.add(_index_key(selector.tag, selector.classes), compiled)
+    return index
+
+
+class _CompiledRule:
+    def __init__(self, rule: Rule, path: str, selector_ids):
+        self.rule = rule
+        self.path = path
+        self.alternatives = [_Selector(selector, next(selector_ids)) for selector in rule.selectors]
+        self.children = [_CompiledRule(child, f"{path}.{child.name}", selector_ids) for child in rule.rules]
+        self.children_index = _rule_index(self.children)
+
+    def match(self, el, classes, ancestors) -> Optional[str]:
+        """يعيد أول محدد بديل يطابق العنصر (لاحتساب العدّاد) أو None."""
+        for selector in self.alternatives:
+            if selector.match(el, classes, ancestors):
+                return selector.text
+        return None
+
+
+class _Scope:
+    """حالة مجموعة قواعد داخل عنصر واحد (المستند كاملاً أو عنصر مطابق لقاعدة متداخلة)."""
+
+    def __init__(self, rules: List[_CompiledRule], index: _Index):
+        self.rules = rules
+        self.index = index
+        self.pending = set(rules)
+        self.matches: Dict[str, Any] = {r.rule.name: ([] if r.rule.many else None) for r in rules}
+
+
+class CompiledRules:
+    def __init__(self, rules: Sequence[Rule]):
+        selector_ids = itertools.count()
+        self.rules = [_CompiledRule(rule, rule.name, selector_ids) for rule in rules]
+        self._index = _rule_index(self.rules)
+        # أجزاء السلاسل (عدا الأخير) التي يجب تتبع تحققها في الأسلاف: (chain_id, index, tag, classes)
+        self._prefixes = _Index()
+        for compiled in _walk(self.rules):
+            for selector in compiled.alternatives:
+                for k, (tag, classes) in enumerate((selector.chain or [])[:-1]):
+                    self._prefixes.add(_index_key(tag, classes), (selector.chain_id, k, tag, classes))
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._documents = 0
+        self._lock = threading.Lock()
+
+    def extract(self, root) -> Dict[str, Any]:
+        hits: Counter = Counter()
+        top = _Scope(self.rules, self._index)
+
+        prefixes = self._prefixes
+        empty = frozenset()
+
+        # مرور واحد (pre-order) بمكدس صريح؛ كل عنصر يحمل النطاقات المفتوحة فوقه
+        # ومجموعة أجزاء السلاسل التي تحققت في أسلافه
+        stack = [(child, (top,), empty) for child in reversed(_tag_children(root))]
+        while stack:
+            el, scopes, ancestors = stack.pop()
+            classes = el.attrs.get("class") or ()
+            keys = _element_keys(el, classes)
+
+            satisfied = [
+                (chain_id, k) for chain_id, k, tag, required in prefixes.lookup(keys)
+                if (k == 0 or (chain_id, k - 1) in ancestors) and _compound_matches(el, classes, tag, required)
+            ]
+            own = ancestors.union(satisfied) if satisfied else ancestors
+
+            child_scopes = scopes
+            for scope in scopes:
+                candidates = scope.index.lookup(keys)
+                if not candidates:
+                    continue
+                if len(candidates) > 1:
+                    candidates = list(dict.fromkeys(candidates))
+                for compiled in candidates:
+                    if compiled not in scope.pending:
+                        continue
+                    selector = compiled.match(el, classes, ancestors)
+                    if selector is None:
+                        continue
+                    hits[(compiled.path, selector)] += 1
+                    nested = None
+                    if compiled.children:
+                        nested = _Scope(compiled.children, compiled.children_index)
+                        child_scopes = child_scopes + (nested,)
+                    value = (el, nested)
+                    if compiled.rule.many:
+                        scope.matches[compiled.rule.name].append(value)
+                    else:
+                        scope.matches[compiled.rule.name] = value
+                        scope.pending.remove(compiled)
+            # النطاقات التي لم يعد لها قواعد معلقة لا تُمرَّر للأحفاد
+            live = tuple(s for s in child_scopes if s.pending)
+            if live:
+                for child in reversed(_tag_children(el)):
+                    stack.append((child, live, own))
+
+        misses: Counter = Counter()
+        result = self._finalize(top, misses)
+        with self._lock:
+            self._documents += 1
+            self._hits.update(hits)
+            self._misses.update(misses)
+        return result
+
+    def _finalize(self, scope: _Scope, misses: Counter) -> Dict[str, Any]:
+        result = {}
+        for compiled in scope.rules:
+            rule = compiled.rule
+            raw = scope.matches[rule.name]
+            if rule.many:
+                if not raw:
+                    misses[compiled.path] += 1
+                result[rule.name] = [self._value(compiled, el, nested, misses) for el, nested in raw]
+            elif raw is None:
+                misses[compiled.path] += 1
+                result[rule.name] = None
+            else:
+                result[rule.name] = self._value(compiled, raw[0], raw[1], misses)
+        return result
+
+    def _value(self, compiled: _CompiledRule, el, nested: Optional[_Scope], misses: Counter):
+        value = el if nested is None else {"element": el, **self._finalize(nested, misses)}
+        return compiled.rule.post(value) if compiled.rule.post else value
+
+    def stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        rules: لكل قاعدة عدد مرات مطابقتها (hits) وعدد المستندات/العناصر التي لم يطابق فيها أي
+        بديل (misses؛ للقواعد المتداخلة يُحسب لكل عنصر أب، مثل كل تعليق).
+        selectors: عدد مرات عمل كل محدد بديل، لمعرفة أي البدائل تُستخدم فعلاً.
+        """
+        rules, selectors = [], []
+        with self._lock:
+            for compiled in _walk(self.rules):
+                hits = 0
+                for selector in compiled.alternatives:
+                    selector_hits = self._hits[(compiled.path, selector.text)]
+                    hits += selector_hits
+                    selectors.append({"rule": compiled.path, "selector": selector.text, "hits": selector_hits})
+                rules.append({
+                    "rule": compiled.path,
+                    "hits": hits,
+                    "misses": self._misses[compiled.path],
+                    "documents": self._documents,
+                })
+        return {"rules": rules, "selectors": selectors}
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits.clear()
+            self._misses.clear()
+            self._documents = 0
+
+
+def _tag_children(el):
+    return [child for child in getattr(el, "contents", ()) if getattr(child, "name", None)]
+
+
+def _walk(rules: List[_CompiledRule]):
+    for compiled in rules:
+        yield compiled
+        yield from _walk(compiled.children)
+
+
+def compile_rules(rules: Sequence[Rule]) -> CompiledRules:
+    return CompiledRules(rules)
@@ -0,0 +1,214 @@
+"""
+تشغيل دفعات الاستخراج كمهام في الخلفية خارج دورة تنفيذ سكربت Streamlit.
+
+المنفّذ (ThreadPoolExecutor) مشترك على مستوى العملية، لذلك تستمر المهام عند إعادة تشغيل
+السكربت (rerun) أو انتقال المستخدم لصفحة أخرى. حالة كل مهمة وتقدمها تُحفظ في جدول
+scrape_jobs لتقرأها الواجهة بشكل دوري.
+
+وحدة الجدولة هي الرابط الواحد وليس الدفعة: تُوزَّع الروابط على العمال بالتناوب (round-robin)
+بين المهام النشطة، فلا تنتظر مهمة مستخدم جديد انتهاء دفعة طويلة لمستخدم آخر؛ تبدأ مع أول
+عامل يتفرغ.
+
+كل عملية تحدّث نبض الحياة (heartbeat_at) للمهام التي ما زالت تنفّذها دورياً؛ المهام التي
+توقف نبضها تُعلَّم interrupted، دون المساس بمهام عمليات أخرى حية على القاعدة نفسها.
+
+فشل الكتابة في القاعدة (مثل "database is locked") لا يوقف المنفّذ: العدادات تُحدَّث دائماً،
+والرابط الذي تعذّر إرساله يعود إلى الطابور، وإنهاء المهمة الذي فشل يُعاد في دورة النبض التالية.
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from database import Database
+
+# كل رابط يشغّل Chromium خاصاً به؛ عدد صغير من العمال يكفي دون إرهاق الجهاز
+MAX_WORKERS = 2
+HEARTBEAT_SECONDS = 30
+# مهلة أطول بكثير من فترة النبض حتى لا تُعلَّم مهمة حية كمتوقفة بسبب تأخير عابر
+STALE_AFTER_SECONDS = HEARTBEAT_SECONDS * 4
+
+# معرّف هذه العملية كمالك للمهام
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _log_error(message: str, error: Exception):
+    print(message, error)
+    traceback.print_exc()
+
+
+class _Job:
+    def __init__(self, job_id: int, urls: List[str]):
+        self.job_id = job_id
+        self.urls = deque(urls)
+        self.total = len(urls)
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.started_at: Optional[float] = None
+
+
+class _JobRunner:
+    """يوزّع روابط المهام النشطة على المنفّذ بالتناوب، مع حد أقصى MAX_WORKERS رابطاً في آن واحد."""
+
+    def __init__(self, db_path: str):
+        self.db = Database(db_path)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="scrape-job")
+        self.lock = threading.Lock()
+        self.rotation: deque = deque()
+        self.jobs: Dict[int, _Job] = {}
+        self.in_flight = 0
+        # مهام انتهت فعلياً لكن تعذّر تسجيل نهايتها في القاعدة
+        self.unfinished: List[_Job] = []
+        self.db.mark_interrupted_jobs(STALE_AFTER_SECONDS)
+        threading.Thread(target=self._heartbeat_loop, name="scrape-job-heartbeat", daemon=True).start()
+
+    def submit(self, urls: List[str]) -> int:
+        job_id = self.db.create_scrape_job(urls, owner=OWNER)
+        with self.lock:
+            job = _Job(job_id, urls)
+            self.jobs[job_id] = job
+            if job.urls:
+                self.rotation.append(job)
+        if not urls:
+            self._finish(job)
+        self._dispatch()
+        return job_id
+
+    def _dispatch(self):
+        to_start = []
+        with self.lock:
+            while self.in_flight < MAX_WORKERS and self.rotation:
+                job = self.rotation.popleft()
+                url = job.urls.popleft()
+                if job.urls:
+                    self.rotation.append(job)
+                job.in_flight += 1
+                self.in_flight += 1
+                first = job.started_at is None
+                if first:
+                    job.started_at = time.time()
+                to_start.append((job, url, first))
+        unsent = []
+        for job, url, first in to_start:
+            if first:
+                try:
+                    self.db.start_scrape_job(job.job_id)
+                except Exception as e:
+                    # حالة running للعرض فقط؛ أول تحديث للتقدم يضبطها
+                    _log_error("Scrape job start error:", e)
+            try:
+                self.executor.submit(self._run_url, job, url)
+            except Exception as e:
+                _log_error("Scrape job submit error:", e)
+                unsent.append((job, url))
+        # بالعكس حتى تعود الروابط إلى مقدمة الطابور بترتيبها الأصلي
+        for job, url in reversed(unsent):
+            self._requeue(job, url)
+
+    def _requeue(self, job: _Job, url: str):
+        """يعيد رابطاً لم يبدأ إلى مقدمة طابور مهمته ويحرر مكانه؛ دورة النبض تعيد المحاولة."""
+        with self.lock:
+            job.urls.appendleft(url)
+            if job not in self.rotation:
+                self.rotation.appendleft(job)
+            job.in_flight -= 1
+            self.in_flight -= 1
+
+    def _run_url(self, job: _Job, url: str):
+        from enhanced_scraper import scrape_post
+
+        url_start = time.time()
+        error = None
+        try:
+            scrape_post(url, db=self.db)
+        except Exception as e:
+            error = str(e)
+
+        try:
+            try:
+                if error is None:
+                    self.db.add_scrape_history(url, "success", items_count=1, duration=time.time() - url_start)
+                else:
+                    self.db.add_scrape_history(url, "failed", duration=time.time() - url_start,
+                                               error_message=error)
+            except Exception as e:
+                _log_error("Scrape history error:", e)
+
+            # العدادات تُحدَّث في الذاكرة أولاً حتى لا يضيع مكان العامل إذا فشلت الكتابة
+            with self.lock:
+                if error is None:
+                    job.completed += 1
+                else:
+                    job.failed += 1
+                job.in_flight -= 1
+                self.in_flight -= 1
+                completed, failed = job.completed, job.failed
+                done = not job.urls and job.in_flight == 0
+
+            try:
+                self.db.update_scrape_job_progress(job.job_id, completed, failed, time.time() - job.started_at)
+            except Exception as e:
+                _log_error("Scrape job progress error:", e)
+            if done:
+                self._finish(job)
+        finally:
+            self._dispatch()
+
+    def _finish(self, job: _Job):
+        # تُزال المهمة من self.jobs أولاً فيتوقف نبضها؛ إن بقيت عالقة في القاعدة تُعلَّم interrupted لاحقاً
+        with self.lock:
+            self.jobs.pop(job.job_id, None)
+        try:
+            if job.total and job.failed == job.total:
+                self.db.finish_scrape_job(job.job_id, "failed", error_message="فشل استخراج جميع الروابط")
+            else:
+                self.db.finish_scrape_job(job.job_id, "done")
+        except Exception as e:
+            _log_error("Scrape job finish error:", e)
+            with self.lock:
+                self.unfinished.append(job)
+
+    def _maintain(self):
+        """دورة النبض: تحديث نبض المهام الجارية، وإعادة ما فشل تسجيله أو إرساله، وتنظيف المهام الميتة."""
+        with self.lock:
+            job_ids = list(self.jobs)
+            unfinished, self.unfinished = self.unfinished, []
+        try:
+            self.db.heartbeat_scrape_jobs(OWNER, job_ids)
+        except Exception as e:
+            _log_error("Scrape job heartbeat error:", e)
+        for job in unfinished:
+            self._finish(job)
+        try:
+            # مهام عمليات انتهت (أو أُعيد تحميلها) دون إنهاء مهامها
+            self.db.mark_interrupted_jobs(STALE_AFTER_SECONDS)
+        except Exception as e:
+            _log_error("Scrape job cleanup error:", e)
+        self._dispatch()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(HEARTBEAT_SECONDS)
+            self._maintain()
+
+
+_runners: Dict[str, _JobRunner] = {}
+_runners_lock = threading.Lock()
+
+
+def get_runner(db_path: str = "hsoub_scraper.db") -> _JobRunner:
+    with _runners_lock:
+        if db_path not in _runners:
+            _runners[db_path] = _JobRunner(db_path)
+        return _runners[db_path]
+
+
+def submit_scrape_job(urls: List[str], db_path: str = "hsoub_scraper.db") -> int:
+    """يسجل مهمة جديدة بحالة queued ويضيف روابطها إلى التناوب، ثم يعود فوراً برقم المهمة."""
+    return get_runner(db_path).submit(urls)
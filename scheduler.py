@@ -1,11 +1,11 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.cron import CronTrigger
-from apscheduler.triggers.interval import IntervalTrigger
 from datetime import datetime
 import traceback
 
 class ScraperScheduler:
     def __init__(self, db=None, worker_fn=None):
+        # apscheduler يُستورد هنا وليس على مستوى الوحدة لتسريع استيراد scheduler.py
+        from apscheduler.schedulers.background import BackgroundScheduler
+
         self.scheduler = BackgroundScheduler()
         self.jobs = {}
         self.db = db
@@ -26,6 +26,9 @@ class ScraperScheduler:
             print("Failed to stop scheduler:", e)
 
     def add_task(self, task_id: int, url: str, frequency: str):
+        from apscheduler.triggers.cron import CronTrigger
+        from apscheduler.triggers.interval import IntervalTrigger
+
         try:
             if frequency == "يومي":
                 trigger = CronTrigger(hour=0, minute=0)
@@ -1,18 +1,119 @@
-from playwright.sync_api import sync_playwright
-from bs4 import BeautifulSoup
 import time
 import json
 import re
+import sys
+import threading
+from urllib.parse import urljoin
+
+from extraction import Rule, compile_rules
+
+# ملاحظة: Playwright و BeautifulSoup يتم استيرادهما داخل الدوال عند أول استخدام،
+# حتى لا يدفع app.py والمجدول وأوامر CLI تكلفة تحميلهما عند الإقلاع.
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
     "Accept-Language": "ar,en;q=0.9"
 }
 
+def _text(el):
+    return el.get_text(strip=True)
+
+def _date_value(el):
+    return el.get("datetime") or el.get_text(strip=True)
+
+def _parse_votes(el):
+    try:
+        return int(re.sub(r'[^\d\-]', '', el.get_text(strip=True)))
+    except ValueError:
+        return 0
+
+# قواعد استخراج صفحة المنشور: الحقل ← المحددات البديلة بالترتيب ← المعالجة اللاحقة.
+# تُجمَّع مرة واحدة وتُطبَّق كلها في مرور واحد على المستند (انظر extraction.py).
+POST_RULES = [
+    Rule("title", ["h1"], post=_text),
+    Rule("content", [".post-content", ".idea-body", ".content-body"], rules=[
+        Rule("paragraphs", ["p"], many=True, post=_text),
+    ]),
+    # بديل المحتوى إذا لم يوجد أي من محددات content
+    Rule("body_paragraphs", ["body p"], many=True),
+    Rule("meta", [".post-meta", ".post-info"], rules=[
+        Rule("author_link", ["a[href*='/u/']", "a[href*='/user/']"], post=_text),
+        Rule("author_name", [".user-info span", ".author-name"], post=_text),
+    ]),
+    Rule("date", ["time[datetime]", ".post-meta .date span"], post=_date_value),
+    Rule("votes", [".votes-count", ".score-box .score", ".post-meta .score"], post=_parse_votes),
+    Rule("tags", [".tags a", ".tag-list a", ".post-tags a"], many=True, post=_text),
+    Rule("comments", [".comment", ".comments .comment-item"], many=True, rules=[
+        Rule("body", [".comment-content", ".comment-body"], rules=[
+            Rule("paragraphs", ["p"], many=True, post=_text),
+        ]),
+        Rule("author", [".author", ".user", ".comment-author a"], post=_text),
+    ]),
+]
+
+_compiled_post_rules = None
+_compile_lock = threading.Lock()
+
+def _get_post_rules():
+    global _compiled_post_rules
+    with _compile_lock:
+        if _compiled_post_rules is None:
+            _compiled_post_rules = compile_rules(POST_RULES)
+        return _compiled_post_rules
+
+def extraction_stats():
+    """عدادات POST_RULES منذ بدء العملية: إصابة/إخفاق كل قاعدة، وإصابات كل محدد بديل."""
+    return _get_post_rules().stats()
+
+def parse_post_html(html_content: str, url: str = ""):
+    """
+    يحلل HTML صفحة منشور ويعيد قاموس الحقول، بتطبيق POST_RULES في مرور واحد.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+    fields = _get_post_rules().extract(soup)
+
+    # المحتوى: فقرات عنصر المحتوى، أو فقرات body كاملة إذا لم يوجد
+    if fields["content"] is not None:
+        paragraphs = fields["content"]["paragraphs"]
+    else:
+        paragraphs = [_text(p) for p in fields["body_paragraphs"]]
+    content = "\n\n".join(paragraphs).strip()
+
+    # المؤلف: رابط المؤلف داخل منطقة الميتا داتا، ثم اسم المؤلف النصي
+    author = "غير معروف"
+    meta = fields["meta"]
+    if meta:
+        if meta["author_link"] is not None:
+            author = meta["author_link"]
+        elif meta["author_name"] is not None:
+            author = meta["author_name"]
+
+    comments = []
+    for c in fields["comments"]:
+        text = " ".join(c["body"]["paragraphs"]) if c["body"] else ""
+        comment_author = c["author"] if c["author"] is not None else "غير معروف"
+        comments.append({"author": comment_author, "content": text})
+
+    return {
+        "title": fields["title"] or "",
+        "link": url,
+        "author": author,
+        "date": fields["date"] if fields["date"] is not None else "غير محدد",
+        "votes": fields["votes"] if fields["votes"] is not None else 0,
+        "tags": fields["tags"],
+        "text_content": content[:20000],
+        "full_content": content,
+        "comments": comments
+    }
+
 def scrape_hsoub_io(url: str, delay: float = 1.0):
     """
     قارئ صفحات حسوب io باستخدام Playwright لضمان تحميل محتوى JavaScript.
     """
+    from playwright.sync_api import sync_playwright
+
     try:
         with sync_playwright() as p:
             # استخدام Chromium في وضع headless
@@ -29,75 +130,7 @@ def scrape_hsoub_io(url: str, delay: float = 1.0):
             html_content = page.content()
             browser.close()
 
-        soup = BeautifulSoup(html_content, "html.parser")
-        
-        # 1. العنوان
-        title_el = soup.find("h1")
-        title = title_el.get_text(strip=True) if title_el else ""
-
-        # 2. محتوى الفكرة/المقال
-        content_el = soup.select_one(".post-content, .idea-body, .content-body")
-        if not content_el:
-            content_el = soup.body
-        
-        paragraphs = [p.get_text(strip=True) for p in content_el.find_all("p")] if content_el else []
-        content = "\n\n".join(paragraphs).strip()
-
-        # 3. الميتا داتا (المؤلف، التاريخ، الأصوات، الوسوم) - محددات أكثر موثوقية
-        
-        # المؤلف: البحث عن رابط المؤلف داخل منطقة الميتا داتا
-        author = "غير معروف"
-        meta_area = soup.select_one(".post-meta, .post-info")
-        if meta_area:
-            author_link = meta_area.select_one("a[href*='/u/'], a[href*='/user/']")
-            if author_link:
-                author = author_link.get_text(strip=True)
-            else:
-                author_span = meta_area.select_one(".user-info span, .author-name")
-                if author_span:
-                    author = author_span.get_text(strip=True)
-
-        # التاريخ: البحث عن عنصر <time>
-        date = "غير محدد"
-        time_el = soup.select_one("time[datetime], .post-meta .date span")
-        if time_el:
-            date = time_el.get("datetime") or time_el.get_text(strip=True)
-        
-        # الأصوات: البحث عن عنصر يحتوي على عدد الأصوات
-        votes = 0
-        votes_el = soup.select_one(".votes-count, .score-box .score, .post-meta .score")
-        if votes_el:
-            try:
-                votes_text = re.sub(r'[^\d\-]', '', votes_el.get_text(strip=True))
-                votes = int(votes_text)
-            except ValueError:
-                votes = 0
-
-        # الوسوم: البحث عن جميع الروابط داخل منطقة الوسوم
-        tags = [tag.get_text(strip=True) for tag in soup.select(".tags a, .tag-list a, .post-tags a")]
-
-        # 4. التعليقات
-        comments = []
-        for c in soup.select(".comment, .comments .comment-item"):
-            text_el = c.select_one(".comment-content, .comment-body")
-            text = " ".join(p.get_text(strip=True) for p in text_el.find_all("p")) if text_el else ""
-            
-            comment_author_el = c.select_one(".author, .user, .comment-author a")
-            comment_author = comment_author_el.get_text(strip=True) if comment_author_el else "غير معروف"
-            comments.append({"author": comment_author, "content": text})
-            
-        result = {
-            "title": title,
-            "link": url,
-            "author": author,
-            "date": date,
-            "votes": votes,
-            "tags": tags,
-            "text_content": content[:20000],
-            "full_content": content,
-            "comments": comments
-        }
-        return [result]
+        return [parse_post_html(html_content, url)]
     except Exception as e:
         print("Playwright Scrape error:", e)
         return []
@@ -106,6 +139,9 @@ def scrape_category(category_url: str, pages: int = 1, delay: float = 1.0):
     """
     يستخرج روابط المنشورات من صفحات التصنيف باستخدام Playwright.
     """
+    from playwright.sync_api import sync_playwright
+    from bs4 import BeautifulSoup
+
     all_links = set()
     base_url = "https://io.hsoub.com"
     
@@ -116,7 +152,7 @@ def scrape_category(category_url: str, pages: int = 1, delay: float = 1.0):
             
             for i in range(1, pages + 1):
                 url = f"{category_url}?page={i}" if i > 1 else category_url
-                print(f"Scraping page: {url}")
+                print(f"Scraping page: {url}", file=sys.stderr)
                 page.goto(url, wait_until="networkidle")
                 time.sleep(delay)
                 
@@ -138,5 +174,5 @@ def scrape_category(category_url: str, pages: int = 1, delay: float = 1.0):
             browser.close()
             return list(all_links)
     except Exception as e:
-        print(f"Category Scrape error: {e}")
+        print(f"Category Scrape error: {e}", file=sys.stderr)
         return list(all_links)
@@ -0,0 +1,114 @@
+import sqlite3
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from database import Database, _month_start
+
+
+def _execute(db, sql, params=()):
+    conn = sqlite3.connect(db.db_path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _history(db, url, scraped_at):
+    _execute(db, "INSERT INTO scrape_history (url, status, scraped_at) VALUES (?, 'success', ?)", (url, scraped_at))
+
+
+def test_date_range_query_uses_index(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    conn = db._get_connection()
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM main.scraped_data WHERE scraped_at >= ? AND scraped_at < ?",
+        ("2024-01-01", "2024-02-01"),
+    ))
+    conn.close()
+    assert "idx_scraped_at" in plan
+
+
+def test_end_date_is_inclusive_for_both_timestamp_formats(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    _history(db, "sql-format", "2024-03-31 23:59:59")
+    _history(db, "iso-format", "2024-03-31T23:59:59.500000")
+    _history(db, "start-of-range", "2024-03-01 00:00:00")
+    _history(db, "next-day", "2024-04-01 00:00:00")
+    _history(db, "day-before", "2024-02-29T23:59:59")
+
+    df = db.get_scrape_history_by_date("2024-03-01", "2024-03-31")
+    assert sorted(df["url"]) == ["iso-format", "sql-format", "start-of-range"]
+
+
+def test_archived_month_is_read_back_with_include_archive(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    old = _month_start(date.today(), 12)
+    _history(db, "old", f"{old.isoformat()} 10:00:00")
+    _history(db, "recent", f"{date.today().isoformat()} 10:00:00")
+
+    assert db.archive_old_data(retention_months=6) == {"scrape_history": 1}
+    assert (tmp_path / "archive" / f"x_{old.strftime('%Y_%m')}.db").exists()
+
+    start, end = old.isoformat(), date.today().isoformat()
+    assert list(db.get_scrape_history_by_date(start, end)["url"]) == ["recent"]
+    assert list(db.get_scrape_history_by_date(start, end, include_archive=True)["url"]) == ["recent", "old"]
+
+    # عمود أضيف إلى القاعدة الرئيسية بعد الأرشفة لا يكسر قراءة الأرشيف القديم
+    _execute(db, "ALTER TABLE scrape_history ADD COLUMN worker TEXT")
+    df = db.get_scrape_history_by_date(start, end, include_archive=True)
+    assert list(df["url"]) == ["recent", "old"]
+    assert df["worker"].isna().all()
+
+
+def test_archiving_keeps_scraped_data_dedup(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    item = [{"title": "عنوان", "link": "https://io.hsoub.com/p/1", "text_content": "نص ثابت"}]
+    db.save_scraped_data(item)
+    _execute(db, "UPDATE scraped_data SET scraped_at = '2000-01-01 00:00:00'")
+
+    db.archive_old_data(retention_months=1)
+    db.save_scraped_data(item)
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM scraped_data").fetchone()[0] == 1
+    conn.close()
+
+
+def _fill_and_delete(db):
+    _execute(db, "INSERT INTO scrape_history (url, status, error_message) "
+                 "SELECT 'u', 'failed', hex(randomblob(2000)) FROM (WITH RECURSIVE n(i) AS "
+                 "(SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200) SELECT i FROM n)")
+    _execute(db, "DELETE FROM scrape_history")
+
+
+def test_compact_database_reclaims_pages_incrementally(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    _fill_and_delete(db)
+
+    result = db.compact_database(max_pages=10)
+    assert result["incremental"] is True
+    assert result["freed_pages"] > 0
+    assert result["free_pages"] == 0
+
+
+def test_compact_database_converts_legacy_database_only_on_request(tmp_path):
+    path = str(tmp_path / "legacy.db")
+    # قاعدة أُنشئت قبل تفعيل auto_vacuum=INCREMENTAL
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE legacy (x)")
+    conn.commit()
+    conn.close()
+    db = Database(path)
+    _fill_and_delete(db)
+
+    result = db.compact_database()
+    assert result == {"freed_pages": 0, "free_pages": result["free_pages"], "incremental": False}
+    assert result["free_pages"] > 0
+
+    result = db.compact_database(convert=True)
+    assert result["incremental"] is True
+    assert result["free_pages"] == 0
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    conn.close()
@@ -0,0 +1,108 @@
+import json
+from collections import Counter
+
+from database import Database
+from dataset_builder import RegexTokenizer, _build_record, assign_split, build_dataset
+
+
+def _post(url, content, ready=True):
+    return {
+        "url": url,
+        "title": "عنوان",
+        "main_content": content,
+        "comments": [{"content": "رد " * 20}],
+        "training_ready": ready,
+    }
+
+
+def _records(out_dir):
+    records = []
+    for path in sorted(out_dir.glob("*.jsonl")):
+        with open(path, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f)
+    return records
+
+
+def test_rescraped_posts_are_emitted_once_with_latest_content(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/1", "قديم " * 50))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/2", "ثابت " * 50))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/1", "جديد " * 50))
+
+    out = tmp_path / "out"
+    build_dataset(db, output_dir=str(out), min_tokens=1, workers=1)
+    records = _records(out)
+
+    assert sorted(r["id"] for r in records) == ["https://io.hsoub.com/p/1", "https://io.hsoub.com/p/2"]
+    latest = next(r for r in records if r["id"].endswith("/1"))
+    assert "جديد" in latest["prompt"] and "قديم" not in latest["prompt"]
+
+
+def test_latest_row_decides_training_readiness(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/1", "نص " * 50, ready=True))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/1", "نص " * 50, ready=False))
+
+    rows = [row for batch in db.iter_training_rows() for row in batch]
+    assert rows == []
+
+
+def test_splits_are_pinned_and_follow_ratios():
+    # القيم مثبتة: تغيّر دالة البصمة ينقل منشورات بين train/val/test بين التشغيلات
+    assert [assign_split(f"https://io.hsoub.com/p/{i}") for i in (0, 1, 2, 20, 30)] == [
+        "test", "val", "train", "val", "test",
+    ]
+
+    counts = Counter(assign_split(f"https://io.hsoub.com/p/{i}") for i in range(20000))
+    assert abs(counts["train"] / 20000 - 0.9) < 0.01
+    assert abs(counts["val"] / 20000 - 0.05) < 0.01
+    assert abs(counts["test"] / 20000 - 0.05) < 0.01
+    assert assign_split("https://io.hsoub.com/p/1", ratios=(1.0, 0.0, 0.0)) == "train"
+
+
+def test_prompt_is_truncated_and_comments_packed_within_budget():
+    tokenizer = RegexTokenizer()
+    row = {
+        "post_url": "https://io.hsoub.com/p/1",
+        "title": "",
+        "main_content": " ".join(f"w{i}" for i in range(20)),
+        "comments_json": json.dumps([{"content": "a b c d e f"}, {"content": "g h"}, {"content": "i j k"}]),
+    }
+    counts = {"prompt_tokens": 20, "comment_tokens": [6, 2, 3]}
+
+    record = _build_record(row, tokenizer, counts, max_tokens=15, max_prompt_tokens=10)
+    assert record["prompt"] == " ".join(f"w{i}" for i in range(10))
+    # 5 رموز متبقية: التعليق الأول (6) لا يتسع ويُتجاهل، والثاني (2) والثالث (3) يتسعان
+    assert record["completion"] == "g h\ni j k"
+    assert record["num_tokens"] == 15
+
+    assert _build_record(row, tokenizer, counts, max_tokens=11, max_prompt_tokens=10) is None
+
+
+def test_second_build_reuses_cached_token_counts(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / "x.db"))
+    for i in range(3):
+        db.save_enhanced_training_data(_post(f"https://io.hsoub.com/p/{i}", "نص " * 50))
+    out = str(tmp_path / "out")
+
+    first = build_dataset(db, output_dir=out, min_tokens=1, workers=1)
+    assert first["cached_rows"] == 0
+
+    saved = []
+    monkeypatch.setattr(db, "save_token_counts", lambda counts, tokenizer: saved.extend(counts))
+    second = build_dataset(db, output_dir=out, min_tokens=1, workers=1)
+    assert second["cached_rows"] == 3
+    # لم يُرمَّز أي صف من جديد في العمال
+    assert saved == []
+    assert second["splits"] == first["splits"]
+
+
+def test_cleanup_only_removes_previous_shards(tmp_path):
+    db = Database(str(tmp_path / "x.db"))
+    db.save_enhanced_training_data(_post("https://io.hsoub.com/p/2", "نص " * 50))
+    (tmp_path / "notes-00001.jsonl").write_text("keep", encoding="utf-8")
+    (tmp_path / "train-00007.jsonl").write_text("stale", encoding="utf-8")
+
+    build_dataset(db, output_dir=str(tmp_path), min_tokens=1, workers=1)
+    assert (tmp_path / "notes-00001.jsonl").read_text(encoding="utf-8") == "keep"
+    assert not (tmp_path / "train-00007.jsonl").exists()
@@ -0,0 +1,173 @@
+import os
+
+import pytest
+
+import discovery
+import scraper
+from conftest import FIXTURES
+
+CATEGORY = "https://io.hsoub.com/programming"
+RSS = os.path.join(FIXTURES, "feed.rss")
+ATOM = os.path.join(FIXTURES, "feed.atom")
+SITEMAP = os.path.join(FIXTURES, "sitemap.xml")
+MISSING = os.path.join(FIXTURES, "missing.xml")
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """يسجّل استدعاءات المصادر الأغلى بدلاً من الاتصال بالشبكة أو تشغيل Playwright."""
+    calls = []
+
+    def fake_listing(category_url, pages=1, delay=1.0):
+        calls.append("listing")
+        return iter(())
+
+    def fake_render(category_url, pages=1, delay=1.0):
+        calls.append("rendered")
+        return [f"{CATEGORY}/99-rendered"]
+
+    monkeypatch.setattr(discovery, "iter_listing_html", fake_listing)
+    monkeypatch.setattr(scraper, "scrape_category", fake_render)
+    return calls
+
+
+def test_rss_links_dates_and_guid_fallback():
+    posts = list(discovery.iter_feed(RSS))
+    assert [p["url"] for p in posts] == [
+        f"{CATEGORY}/1-new",
+        f"{CATEGORY}/2-old",
+        f"{CATEGORY}/3-guid",
+    ]
+    assert posts[0]["lastmod"] == "2024-05-06T07:00:00+00:00"
+    assert posts[2]["lastmod"] is None
+
+
+def test_atom_prefers_alternate_link_and_first_date():
+    posts = list(discovery.iter_feed(ATOM))
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/1-a", f"{CATEGORY}/2-b"]
+    assert posts[0]["lastmod"] == "2024-05-01T12:00:00+00:00"
+    assert posts[1]["lastmod"] == "2024-03-01T06:00:00+00:00"
+
+
+def test_sitemap_index_is_followed(tmp_path):
+    index = tmp_path / "index.xml"
+    index.write_text(
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<sitemap><loc>{SITEMAP}</loc></sitemap></sitemapindex>",
+        encoding="utf-8",
+    )
+    posts = list(discovery.iter_sitemap(str(index)))
+    assert len(posts) == 4
+    assert posts[0]["lastmod"] == "2023-01-01T00:00:00+00:00"
+
+
+def test_since_filters_old_entries(calls):
+    posts = list(discovery.discover_posts(CATEGORY, feeds=[RSS], sitemaps=[], since="2024-05-02"))
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/1-new", f"{CATEGORY}/3-guid"]
+
+
+def test_feed_with_nothing_new_does_not_fall_back(calls):
+    posts = list(discovery.discover_posts(CATEGORY, feeds=[ATOM], sitemaps=[SITEMAP], since="2025-01-01"))
+    assert posts == []
+    assert calls == []
+
+
+def test_sitemap_used_when_feeds_missing_and_capped_to_newest(calls):
+    posts = list(discovery.discover_posts(CATEGORY, feeds=[MISSING], sitemaps=[SITEMAP], limit=2))
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/12-newest", f"{CATEGORY}/13-middle"]
+    assert {p["source"] for p in posts} == {"sitemap"}
+    assert calls == []
+
+
+def test_listing_then_rendered_fallback_order(calls):
+    posts = list(discovery.discover_posts(CATEGORY, feeds=[MISSING], sitemaps=[MISSING]))
+    assert calls == ["listing", "rendered"]
+    assert [p["source"] for p in posts] == ["rendered"]
+
+
+def test_no_render_stops_before_playwright(calls):
+    assert list(discovery.discover_posts(CATEGORY, feeds=[MISSING], sitemaps=[], fallback=False)) == []
+    assert calls == ["listing"]
+
+
+def test_diagnostics_do_not_pollute_stdout(calls, capsys):
+    list(discovery.discover_posts(CATEGORY, feeds=[MISSING], sitemaps=[MISSING], fallback=False))
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "Feed unavailable" in err
+
+
+def test_cli_discover_prints_only_urls(calls, capsys, tmp_path):
+    import cli
+
+    code = cli.main(["--db", str(tmp_path / "x.db"), "discover", CATEGORY,
+                     "--feed", MISSING, "--feed", ATOM, "--sitemap", SITEMAP])
+    out, _ = capsys.readouterr()
+    assert code == 0
+    assert out.splitlines() == [f"{CATEGORY}/1-a", f"{CATEGORY}/2-b"]
+
+
+def _urlset(*paths):
+    urls = "".join(f"<url><loc>{CATEGORY.rsplit('/', 1)[0]}{p}</loc></url>" for p in paths)
+    return f'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    """يسجّل كل ملف/رابط يفتحه _Stream."""
+    fetched = []
+
+    class _Recording(discovery._Stream):
+        def __enter__(self):
+            fetched.append(os.path.basename(self.source))
+            return super().__enter__()
+
+    monkeypatch.setattr(discovery, "_Stream", _Recording)
+    return fetched
+
+
+def test_sitemap_index_prefers_category_skips_stale_and_caps_fetches(tmp_path, fetched):
+    nested = {
+        "culture.xml": ("2024-06-01", _urlset("/culture/1-x")),
+        "programming-old.xml": ("2023-01-01", _urlset("/programming/1-old")),
+        "programming-new.xml": ("2024-06-01", _urlset("/programming/2-new")),
+        "programming-mid.xml": ("2024-05-01", _urlset("/programming/3-mid")),
+    }
+    entries = ""
+    for name, (lastmod, body) in nested.items():
+        (tmp_path / name).write_text(body, encoding="utf-8")
+        entries += f"<sitemap><loc>{tmp_path / name}</loc><lastmod>{lastmod}</lastmod></sitemap>"
+    index = tmp_path / "index.xml"
+    index.write_text(f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{entries}</sitemapindex>',
+                     encoding="utf-8")
+
+    posts = list(discovery.iter_sitemap(str(index), since="2024-01-01", category_url=CATEGORY, max_files=2))
+    assert fetched == ["index.xml", "programming-new.xml"]
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/2-new"]
+
+
+def test_default_feed_alternates_stop_after_first_response(calls, monkeypatch):
+    requested = []
+
+    def fake_feed(source):
+        requested.append(source)
+        return iter([{"url": f"{CATEGORY}/1-a", "lastmod": None, "source": "feed"}])
+
+    monkeypatch.setattr(discovery, "iter_feed", fake_feed)
+    posts = list(discovery.discover_posts(CATEGORY, sitemaps=[]))
+    assert requested == [f"{CATEGORY}.rss"]
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/1-a"]
+
+
+def test_default_sitemaps_skip_robots_when_sitemap_xml_responds(calls, monkeypatch):
+    requested = []
+
+    def fake_sitemap(source, **kwargs):
+        requested.append(source)
+        return iter([{"url": f"{CATEGORY}/1-a", "lastmod": None, "source": "sitemap"}])
+
+    monkeypatch.setattr(discovery, "iter_sitemap", fake_sitemap)
+    posts = list(discovery.discover_posts(CATEGORY, feeds=[MISSING]))
+    # الخروج قبل طلب المصدر التالي من المولّد يعني أن robots.txt لم يُجلب
+    assert requested == ["https://io.hsoub.com/sitemap.xml"]
+    assert [p["url"] for p in posts] == [f"{CATEGORY}/1-a"]
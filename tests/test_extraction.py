@@ -0,0 +1,138 @@
+import re
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from bs4 import BeautifulSoup
+
+import scraper
+
+
+def _reference_parse(html, url=""):
+    """منطق الاستخراج السابق (select/select_one لكل حقل) كمرجع للمقارنة."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_el = soup.find("h1")
+    title = title_el.get_text(strip=True) if title_el else ""
+
+    content_el = soup.select_one(".post-content, .idea-body, .content-body")
+    if not content_el:
+        content_el = soup.body
+    paragraphs = [p.get_text(strip=True) for p in content_el.find_all("p")] if content_el else []
+    content = "\n\n".join(paragraphs).strip()
+
+    author = "غير معروف"
+    meta_area = soup.select_one(".post-meta, .post-info")
+    if meta_area:
+        author_link = meta_area.select_one("a[href*='/u/'], a[href*='/user/']")
+        if author_link:
+            author = author_link.get_text(strip=True)
+        else:
+            author_span = meta_area.select_one(".user-info span, .author-name")
+            if author_span:
+                author = author_span.get_text(strip=True)
+
+    date = "غير محدد"
+    time_el = soup.select_one("time[datetime], .post-meta .date span")
+    if time_el:
+        date = time_el.get("datetime") or time_el.get_text(strip=True)
+
+    votes = 0
+    votes_el = soup.select_one(".votes-count, .score-box .score, .post-meta .score")
+    if votes_el:
+        try:
+            votes = int(re.sub(r'[^\d\-]', '', votes_el.get_text(strip=True)))
+        except ValueError:
+            votes = 0
+
+    tags = [tag.get_text(strip=True) for tag in soup.select(".tags a, .tag-list a, .post-tags a")]
+
+    comments = []
+    for c in soup.select(".comment, .comments .comment-item"):
+        text_el = c.select_one(".comment-content, .comment-body")
+        text = " ".join(p.get_text(strip=True) for p in text_el.find_all("p")) if text_el else ""
+        author_el = c.select_one(".author, .user, .comment-author a")
+        comments.append({"author": author_el.get_text(strip=True) if author_el else "غير معروف", "content": text})
+
+    return {
+        "title": title,
+        "link": url,
+        "author": author,
+        "date": date,
+        "votes": votes,
+        "tags": tags,
+        "text_content": content[:20000],
+        "full_content": content,
+        "comments": comments,
+    }
+
+
+CASES = {
+    "nested_comments": """
+        <html><body><h1>سؤال</h1>
+        <div class="post-content"><p>نص</p></div>
+        <div class="comment"><span class="author">أ</span>
+          <div class="comment-content"><p>رد أول</p>
+            <div class="comment"><span class="author">ب</span>
+              <div class="comment-content"><p>رد متداخل</p></div></div>
+          </div></div>
+        <div class="comment"><div class="comment-body"><p>بدون مؤلف</p></div></div>
+        </body></html>""",
+    "self_nesting_containers": """
+        <html><body><h1>أول</h1><h1>ثان</h1>
+        <div class="post-content"><p>خارجي</p><div class="post-content"><p>داخلي</p></div></div>
+        <div class="tags"><a>أ</a><div class="tags"><a>ب</a></div><a>ج</a></div>
+        <ul class="tag-list"><li><a>د</a></li></ul>
+        </body></html>""",
+    "chain_prefix_outside_scope": """
+        <html><body><h1>ع</h1>
+        <div class="post-meta"><div class="user-info"><span>كاتب</span></div>
+          <span class="date"><span>أمس</span></span><b class="score">+7</b></div>
+        <div class="comment-author">
+          <div class="comment"><a href="/x">مؤلف من الخارج</a>
+            <div class="comment-body"><p>ت</p></div></div>
+        </div>
+        <div class="comments"><div class="comment-item">
+          <div class="user-info"><span>ليس مؤلف المنشور</span></div>
+          <div class="comment-content"><p>عنصر</p></div></div></div>
+        </body></html>""",
+    "attribute_fallback": """
+        <html><body><h1>ع</h1>
+        <div class="post-info"><a href="/tags/python">وسم</a><a href="https://io.hsoub.com/user/sara">سارة</a>
+          <span class="author-name">اسم نصي</span></div>
+        <time>بلا سمة</time><time datetime="2024-01-02T03:04:05Z">٢ يناير</time>
+        <span class="votes-count">غير رقمي</span>
+        </body></html>""",
+    "missing_content_block": """
+        <html><body><h1>ع</h1><p>فقرة ١</p><div><p>فقرة ٢</p></div>
+        <div class="score-box"><span class="score">-3</span></div>
+        </body></html>""",
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_compiled_rules_match_reference(name):
+    html = CASES[name]
+    assert scraper.parse_post_html(html, "https://io.hsoub.com/p/1") == _reference_parse(html, "https://io.hsoub.com/p/1")
+
+
+def test_rule_stats_count_fallback_selectors():
+    rules = scraper._get_post_rules()
+    rules.reset_stats()
+    scraper.parse_post_html(CASES["attribute_fallback"])
+    scraper.parse_post_html(CASES["missing_content_block"])
+
+    stats = scraper.extraction_stats()
+    selectors = {(row["rule"], row["selector"]): row["hits"] for row in stats["selectors"]}
+    assert selectors[("meta.author_link", "a[href*='/user/']")] == 1
+    assert selectors[("date", "time[datetime]")] == 1
+    assert selectors[("votes", ".score-box .score")] == 1
+
+    # الإخفاق يُحسب مرة لكل قاعدة (لا لكل محدد بديل)
+    rules = {row["rule"]: row for row in stats["rules"]}
+    assert len(rules) == len(stats["rules"])
+    assert (rules["content"]["hits"], rules["content"]["misses"]) == (0, 2)
+    assert (rules["votes"]["hits"], rules["votes"]["misses"]) == (2, 0)
+    assert rules["meta.author_name"]["misses"] == 0
+    assert rules["title"]["documents"] == 2
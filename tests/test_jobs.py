@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import time
+
+import enhanced_scraper
+import jobs
+from database import Database
+
+
+def _wait_done(db, job_ids, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if all(db.get_scrape_job(j)["status"] in ("done", "failed") for j in job_ids):
+            return
+        time.sleep(0.02)
+    raise AssertionError("jobs did not finish")
+
+
+def test_jobs_are_interleaved_per_url(monkeypatch, tmp_path):
+    order = []
+    lock = threading.Lock()
+
+    def fake_scrape_post(url, db=None):
+        time.sleep(0.02)
+        with lock:
+            order.append(url)
+
+    monkeypatch.setattr(enhanced_scraper, "scrape_post", fake_scrape_post)
+    monkeypatch.setattr(jobs, "MAX_WORKERS", 1)
+    db_path = str(tmp_path / "jobs.db")
+    runner = jobs._JobRunner(db_path)
+
+    long_job = runner.submit([f"long-{i}" for i in range(6)])
+    short_job = runner.submit(["short-0"])
+    _wait_done(runner.db, [long_job, short_job])
+
+    # المهمة القصيرة لا تنتظر انتهاء الدفعة الطويلة كاملة
+    assert order.index("short-0") < order.index("long-5")
+    job = runner.db.get_scrape_job(long_job)
+    assert (job["status"], job["completed_urls"], job["failed_urls"]) == ("done", 6, 0)
+
+
+def test_only_stale_jobs_are_marked_interrupted(tmp_path):
+    db = Database(str(tmp_path / "jobs.db"))
+    live = db.create_scrape_job(["a"], owner="live-process")
+    dead = db.create_scrape_job(["b"], owner="dead-process")
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("UPDATE scrape_jobs SET heartbeat_at = datetime('now', '-1 hour') WHERE id = ?", (dead,))
+    conn.commit()
+    conn.close()
+
+    assert db.mark_interrupted_jobs(stale_after_seconds=120) == 1
+    assert db.get_scrape_job(live)["status"] == "queued"
+    assert db.get_scrape_job(dead)["error_message"] == "interrupted"
+
+
+def _locked(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+def test_db_write_failures_do_not_leak_workers_or_strand_jobs(monkeypatch, tmp_path):
+    monkeypatch.setattr(enhanced_scraper, "scrape_post", lambda url, db=None: None)
+    runner = jobs._JobRunner(str(tmp_path / "jobs.db"))
+    finish = runner.db.finish_scrape_job
+    monkeypatch.setattr(runner.db, "start_scrape_job", _locked)
+    monkeypatch.setattr(runner.db, "update_scrape_job_progress", _locked)
+    monkeypatch.setattr(runner.db, "add_scrape_history", _locked)
+    monkeypatch.setattr(runner.db, "finish_scrape_job", _locked)
+
+    # أكثر من MAX_WORKERS مهمة: لو ضاع مكان عامل لتوقفت المهام اللاحقة
+    job_ids = [runner.submit([f"u{i}-{k}" for k in range(2)]) for i in range(jobs.MAX_WORKERS + 2)]
+    deadline = time.time() + 10
+    while time.time() < deadline and (runner.in_flight or runner.jobs):
+        time.sleep(0.02)
+    assert runner.in_flight == 0 and runner.jobs == {}
+    assert {job.job_id for job in runner.unfinished} == set(job_ids)
+
+    # دورة النبض التالية تعيد تسجيل نهاية المهام بعد تحرر القاعدة
+    monkeypatch.setattr(runner.db, "finish_scrape_job", finish)
+    runner._maintain()
+    assert runner.unfinished == []
+    assert {runner.db.get_scrape_job(j)["status"] for j in job_ids} == {"done"}
+
+
+def test_submit_failure_requeues_url(monkeypatch, tmp_path):
+    runner = jobs._JobRunner(str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(runner.executor, "submit", _locked)
+    job_id = runner.submit(["a", "b"])
+    assert runner.in_flight == 0
+    assert list(runner.jobs[job_id].urls) == ["a", "b"]
+    assert runner.rotation[0].job_id == job_id
+
+
+def test_heartbeat_only_refreshes_jobs_still_running_here(tmp_path):
+    runner = jobs._JobRunner(str(tmp_path / "jobs.db"))
+    # مهمة بنفس المالك عالقة في القاعدة لكنها لم تعد في ذاكرة المنفّذ
+    stranded = runner.db.create_scrape_job(["x"], owner=jobs.OWNER)
+    conn = sqlite3.connect(runner.db.db_path)
+    conn.execute("UPDATE scrape_jobs SET heartbeat_at = datetime('now', '-1 hour') WHERE id = ?", (stranded,))
+    conn.commit()
+    conn.close()
+
+    runner._maintain()
+    job = runner.db.get_scrape_job(stranded)
+    assert (job["status"], job["error_message"]) == ("failed", "interrupted")